@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Measure bytes per `Card` on a synthetic 100k-card corpus.
+
+Compares the slotted, interned `types.Card` with the previous plain
+dataclass (per-instance `__dict__`, fresh tag list per card). Cards are
+built by the real parser from pre-parsed XML elements; allocations are
+measured with tracemalloc.
+
+Usage: python benchmarks/bench_card_memory.py [--cards N]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import gc
+import argparse
+import tracemalloc
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deck_pdf_generator import parser  # noqa: E402
+
+
+@dataclass
+class LegacyCard:
+    id: str
+    type: str
+    cost: int
+    name: str
+    subtitle: str
+    effect: str
+    hp: int = None
+    atk: int = None
+    lootBudget: int = None
+    biome: Optional[str] = None
+    back_icon: Optional[str] = None
+    school: Optional[str] = None
+    slot: Optional[str] = None
+    klass: Optional[str] = None
+    front_icon: Optional[str] = None
+    deck: Optional[str] = None
+    count: int = 1
+    tags: List[str] = None
+
+
+SCHOOLS = ["attack", "defense", "spell", "utility"]
+SLOTS = ["one_hand", "two_hand", "shield", "armor", "head", "ring", "necklace"]
+CLASSES = ["mage", "warrior", "paladin", "hunter", "thief"]
+BIOMES = ["forest", "swamp", "desert", "mountains", "cave"]
+TAGS = ["weapon,melee", "weapon,ranged", "boss", "magic", ""]
+
+
+def synthetic_nodes(n: int) -> list:
+    nodes = []
+    for i in range(n):
+        if i % 3 == 2:
+            xml = (f'<card id="monster_{i}" tags="{TAGS[i % len(TAGS)]}"><name>Netvor {i}</name>'
+                   f'<text>Útočí na nejbližšího hrdinu.</text>'
+                   f'<monster hp="{i % 9}" atk="{i % 5}" lootBudget="{i % 4}" biome="{BIOMES[i % len(BIOMES)]}"/></card>')
+        else:
+            xml = (f'<card id="loot_{i}" tags="{TAGS[i % len(TAGS)]}"><name>Předmět {i}</name>'
+                   f'<subtitle>Vybavení</subtitle><text>Hráč získá +{i % 4} k útoku.</text>'
+                   f'<loot lootType="item" cost="{i % 7}" school="{SCHOOLS[i % len(SCHOOLS)]}" '
+                   f'slot="{SLOTS[i % len(SLOTS)]}" class="{CLASSES[i % len(CLASSES)]}"/></card>')
+        nodes.append(ET.fromstring(xml))
+    return nodes
+
+
+def measure(card_cls, nodes: list) -> float:
+    parser.Card = card_cls
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    cards = [parser._card_from_node(node, i) for i, node in enumerate(nodes)]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del cards
+    return used / len(nodes)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cards", type=int, default=100000, help="Number of cards in the corpus")
+    args = ap.parse_args()
+
+    from deck_pdf_generator.types import Card
+
+    nodes = synthetic_nodes(args.cards)
+    legacy = measure(LegacyCard, nodes)
+    compact = measure(Card, nodes)
+    print(f"Corpus: {args.cards} cards")
+    print(f"legacy dataclass: {legacy:.0f} bytes/card")
+    print(f"slotted + interned: {compact:.0f} bytes/card ({100.0 * (1 - compact / legacy):.0f}% less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Render a multi-GB synthetic deck in huge-tree mode under a memory ceiling.
+
+A deck of the requested size is generated in a temporary directory and
+run end to end through `pipeline.process_file(huge=True, max_rss=...)`
+in a fresh subprocess: streamed with `iterparse(huge_tree=True)` and
+rendered into PDF parts of `pipeline.HUGE_PAGES_PER_FILE` sheets. The
+run reports throughput, the files written and peak RSS. A second run
+with a ceiling below the interpreter's own footprint checks that
+`MemoryLimitExceeded` aborts cleanly with a diagnostic.
+
+Rendering is far slower than parsing (a few thousand cards/s), so the
+default deck is small; pass e.g. `--gb 2` for a multi-GB run.
+
+Usage: python benchmarks/bench_huge.py [--gb SIZE] [--max-rss MB]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CARD_TEMPLATES = [
+    '<card id="coin_{i}" count="3"><name>Mince {i}</name><subtitle>Peníze</subtitle>'
+    '<text>Jedna zlatá mince. Příliš žluťoučký kůň úpěl ďábelské ódy.</text>'
+    '<loot lootType="coin" cost="1"/></card>',
+    '<card id="sword_{i}" tags="weapon,melee"><name>Meč {i}</name><text>+2 útok</text>'
+    '<loot lootType="item" cost="5" slot="one_hand" class="warrior"/></card>',
+    '<!-- procedurálně generováno -->',
+    '<card id="goblin_{i}" tags="boss"><name>Goblin {i}</name><subtitle>Zelený</subtitle>'
+    '<text>Krade mince.</text><monster hp="5" atk="2" lootBudget="3" biome="forest"/></card>',
+]
+
+
+def write_deck(path: str, size: int) -> int:
+    """Write a deck of at least `size` bytes and return its number of elements."""
+    n = 0
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<cards>\n')
+        while written < size:
+            chunk = "".join(CARD_TEMPLATES[i % len(CARD_TEMPLATES)].format(i=i) + "\n" for i in range(n, n + 1000))
+            f.write(chunk)
+            written += len(chunk.encode("utf-8"))
+            n += 1000
+        f.write('</cards>\n')
+    return n
+
+
+def run_pipeline(xml_path: str, outdir: str, max_rss: int) -> dict:
+    from deck_pdf_generator import parser, pipeline
+
+    t0 = time.perf_counter()
+    try:
+        result = pipeline.process_file(xml_path, outdir, cache_dir=None, huge=True, max_rss=max_rss)
+    except parser.MemoryLimitExceeded as e:
+        cards, files, error = 0, [], str(e)
+    else:
+        cards, files, error = sum(result.counts.values()), result.out_files, None
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return {"cards": cards, "files": files, "seconds": elapsed, "peak_rss_mb": peak, "error": error}
+
+
+def run_in_subprocess(xml_path: str, outdir: str, max_rss_mb: int) -> dict:
+    out = subprocess.check_output([sys.executable, __file__, "--run", xml_path, "--outdir", outdir,
+                                   "--max-rss", str(max_rss_mb)])
+    return json.loads(out.splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--gb", type=float, default=0.02, help="Size of the generated deck in GiB")
+    ap.add_argument("--max-rss", type=int, default=200, help="Memory ceiling for the huge-mode run in MiB")
+    ap.add_argument("--run", help=argparse.SUPPRESS)
+    ap.add_argument("--outdir", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.run:
+        print(json.dumps(run_pipeline(args.run, args.outdir, args.max_rss * 2 ** 20)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_path = os.path.join(tmp, "huge.xml")
+        outdir = os.path.join(tmp, "out")
+        t0 = time.perf_counter()
+        elements = write_deck(xml_path, int(args.gb * 2 ** 30))
+        size_mb = os.path.getsize(xml_path) / 2 ** 20
+        print(f"Synthetic deck: {elements} top-level elements, {size_mb:.1f} MiB "
+              f"(generated in {time.perf_counter() - t0:.1f} s)")
+
+        r = run_in_subprocess(xml_path, outdir, args.max_rss)
+        if r["error"]:
+            raise SystemExit(f"Huge mode hit the {args.max_rss} MiB ceiling: {r['error']}")
+        pdf_mb = sum(os.path.getsize(p) for p in r["files"]) / 2 ** 20
+        print(f"huge mode: {r['seconds']:.1f} s, {r['cards'] / r['seconds']:,.0f} cards/s, "
+              f"{r['cards']} printed cards in {len(r['files'])} PDF parts ({pdf_mb:.0f} MiB), "
+              f"peak RSS {r['peak_rss_mb']:.1f} MB (limit {args.max_rss} MiB)")
+
+        r = run_in_subprocess(xml_path, os.path.join(tmp, "out1"), 1)
+        if not r["error"]:
+            raise SystemExit("A 1 MiB ceiling did not abort the run")
+        print(f"1 MiB ceiling: aborted: {r['error']}")
+
+
+if __name__ == "__main__":
+    main()
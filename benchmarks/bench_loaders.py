@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Compare card loading throughput of the XML, JSON Lines and CSV loaders.
+
+The same synthetic deck is written in all three formats and streamed with
+`parser.iter_card_runs()`, `iter_jsonl_card_runs()` and
+`iter_csv_card_runs()`. The loaders must produce identical runs; the
+script reports rows per second for each.
+
+Usage: python benchmarks/bench_loaders.py [--cards N] [--repeat R]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deck_pdf_generator import parser  # noqa: E402
+
+ROWS = [
+    {"id": "coin_{i}", "count": "3", "name": "Mince {i}", "subtitle": "Peníze",
+     "text": "Jedna zlatá mince. Příliš žluťoučký kůň úpěl ďábelské ódy.", "lootType": "coin", "cost": "1"},
+    {"id": "sword_{i}", "tags": "weapon,melee", "name": "Meč {i}", "text": "+2 útok",
+     "lootType": "item", "cost": "5", "slot": "one_hand", "class": "warrior"},
+    {"id": "goblin_{i}", "tags": "boss", "name": "Goblin {i}", "subtitle": "Zelený", "text": "Krade mince.",
+     "deck": "monster", "hp": "5", "atk": "2", "lootBudget": "3", "biome": "forest"},
+]
+CARD_ATTRS = ("id", "count", "tags")
+LOOT_ATTRS = ("lootType", "cost", "slot", "class")
+MONSTER_ATTRS = ("hp", "atk", "lootBudget", "biome")
+COLUMNS = sorted({k for row in ROWS for k in row})
+
+
+def rows(n: int):
+    for i in range(n):
+        yield {k: v.format(i=i) for k, v in ROWS[i % len(ROWS)].items()}
+
+
+def _attrs(row: dict, keys) -> str:
+    return "".join(f' {k}="{row[k]}"' for k in keys if k in row)
+
+
+def write_xml(path: str, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<cards>\n")
+        for row in rows(n):
+            child = (f"<loot{_attrs(row, LOOT_ATTRS)}/>" if "lootType" in row
+                     else f"<monster{_attrs(row, MONSTER_ATTRS)}/>")
+            sub = f"<subtitle>{row['subtitle']}</subtitle>" if "subtitle" in row else ""
+            f.write(f"<card{_attrs(row, CARD_ATTRS)}><name>{row['name']}</name>{sub}"
+                    f"<text>{row['text']}</text>{child}</card>\n")
+        f.write("</cards>\n")
+
+
+def write_jsonl(path: str, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows(n):
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def write_csv(path: str, n: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows(n))
+
+
+def bench(loader, path: str, repeat: int):
+    best = None
+    runs = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        runs = list(loader(path))
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, runs
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cards", type=int, default=100000, help="Number of card rows in the deck")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per loader; the best time is reported")
+    args = ap.parse_args()
+
+    formats = [
+        ("xml", write_xml, parser.iter_card_runs),
+        ("jsonl", write_jsonl, parser.iter_jsonl_card_runs),
+        ("csv", write_csv, parser.iter_csv_card_runs),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Deck: {args.cards} card rows")
+        reference = None
+        for ext, write, loader in formats:
+            path = os.path.join(tmp, f"deck.{ext}")
+            write(path, args.cards)
+            elapsed, runs = bench(loader, path, args.repeat)
+            if reference is None:
+                reference = runs
+            elif runs != reference:
+                raise SystemExit(f"{ext} loader produced different cards than xml")
+            size = os.path.getsize(path) / 2 ** 20
+            print(f"{ext:>5}: {elapsed:.3f} s, {args.cards / elapsed:,.0f} rows/s ({size:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Compare `fonts.measure()` with `pdfmetrics.stringWidth()` on Czech card text.
+
+Card names, subtitles and effect texts full of diacritics (the common
+case for the Czech decks) are measured with both functions, which must
+return identical widths. The effect texts are also wrapped with
+`render.wrap_text()` and with a reference wrap that measures every trial
+line with `stringWidth()`, as the renderer used to.
+
+Usage: python benchmarks/bench_measure.py [--font NAME] [--repeat R]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfbase import pdfmetrics  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+from deck_pdf_generator import config, fonts, render  # noqa: E402
+
+TEXTS = [
+    "Příliš žluťoučký kůň úpěl ďábelské ódy",
+    "Šťastný řečník",
+    "Zelený skřet ze Středohoří",
+    "Získej 3 mince. Pokud máš v ruce zbraň, zaútoč ještě jednou a způsob 2 zranění.",
+    "Když nepřítel zemře, lízni si kartu kořisti.\\nNa konci kola ji odhoď.",
+    "Ďábelský úder: všechny příšery v lese ztrácejí 1 život; čarodějnice navíc 2.",
+    "Úžasně těžká válečná sekyra, kterou unese jen opravdový bojovník",
+    "Štít • obrana • +2 ❤️",
+]
+
+
+def reference_wrap(text: str, max_width: float, font_name: str, font_size: int) -> list:
+    lines = []
+    for para in text.replace("\\n", "\n").split("\n"):
+        if para.strip() == "":
+            lines.append("")
+            continue
+        cur: list = []
+        for w in para.split():
+            if pdfmetrics.stringWidth(" ".join(cur + [w]), font_name, font_size) <= max_width:
+                cur.append(w)
+            elif cur:
+                lines.append(" ".join(cur))
+                cur = [w]
+            else:
+                lines.append(w)
+        if cur:
+            lines.append(" ".join(cur))
+    return lines
+
+
+def best_of(repeat: int, fn) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--font", help="Registered font to measure with (default: the regular font)")
+    ap.add_argument("--loops", type=int, default=20000, help="Passes over the sample texts per run")
+    ap.add_argument("--repeat", type=int, default=5, help="Runs per function; the best time is reported")
+    args = ap.parse_args()
+
+    regular = fonts.load_fonts(None).regular
+    font = args.font or regular
+    size = config.BODY_SIZE
+    for text in TEXTS:
+        if fonts.measure(text, font, size) != pdfmetrics.stringWidth(text, font, size):
+            raise SystemExit(f"measure() differs from stringWidth() for {text!r}")
+    n = args.loops * len(TEXTS)
+    texts = TEXTS * args.loops
+    print(f"Font: {font}, {n} strings, {sum(map(len, texts)) / n:.0f} characters on average")
+    base = best_of(args.repeat, lambda: [pdfmetrics.stringWidth(t, font, size) for t in texts])
+    fast = best_of(args.repeat, lambda: [fonts.measure(t, font, size) for t in texts])
+    print(f"stringWidth: {base / n * 1e6:.2f} us/string")
+    print(f"    measure: {fast / n * 1e6:.2f} us/string ({base / fast:.1f}x)")
+
+    c = canvas.Canvas(os.devnull)
+    width = config.CARD_W - 2 * config.PADDING
+    for text in TEXTS:
+        if render.wrap_text(c, text, width, font, size) != reference_wrap(text, width, font, size):
+            raise SystemExit(f"wrap_text() wraps {text!r} differently from the reference")
+    texts = TEXTS * (args.loops // 10)
+    n = len(texts)
+    base = best_of(args.repeat, lambda: [reference_wrap(t, width, font, size) for t in texts])
+    fast = best_of(args.repeat, lambda: [render.wrap_text(c, t, width, font, size) for t in texts])
+    print(f"wrap (stringWidth per trial line): {base / n * 1e6:.1f} us/text")
+    print(f"               render.wrap_text(): {fast / n * 1e6:.1f} us/text ({base / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
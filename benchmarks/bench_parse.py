@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Benchmark `parser.parse_cards()` on a large synthetic deck.
+
+Compares the current native lxml extraction path against the previous
+lxml -> bytes -> ElementTree round trip. Each mode runs in a fresh
+subprocess so that peak RSS is measured independently. First checks
+that the streaming parser (`iter_card_runs()`, also in huge-tree mode)
+reads the same cards as `parse_card_runs()` from a deck with XIncludes
+at the top level and inside cards.
+
+Usage: python benchmarks/bench_parse.py [--cards N]
+"""
+
+from __future__ import annotations
+
+import os
+import dataclasses
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CARD_TEMPLATES = [
+    '<card id="coin_{i}" count="3"><name>Mince {i}</name><subtitle>Peníze</subtitle>'
+    '<text>Jedna zlatá mince. Příliš žluťoučký kůň úpěl ďábelské ódy.</text>'
+    '<loot lootType="coin" cost="1"/></card>',
+    '<card id="sword_{i}" tags="weapon,melee"><name>Meč {i}</name><text>+2 útok</text>'
+    '<loot lootType="item" cost="5" slot="one_hand" class="warrior"/></card>',
+    '<card id="goblin_{i}" tags="boss"><name>Goblin {i}</name><subtitle>Zelený</subtitle>'
+    '<text>Krade mince.</text><monster hp="5" atk="2" lootBudget="3" biome="forest"/></card>',
+]
+
+
+def write_deck(path: str, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<cards>\n')
+        for i in range(n):
+            f.write(CARD_TEMPLATES[i % len(CARD_TEMPLATES)].format(i=i))
+            f.write('\n')
+        f.write('</cards>\n')
+
+
+INCLUDE_DECK = """<cards xmlns:xi="http://www.w3.org/2001/XInclude">
+  <card id="text"><name>Text</name><text><xi:include href="parts/effect.txt" parse="text"/></text>
+    <loot lootType="item" cost="1"/></card>
+  <card id="mixed"><xi:include href="parts/names.xml" xpointer="xpointer(/names/name)"/>
+    <text>Před <xi:include href="parts/effect.txt" parse="text"/> po</text><loot lootType="item" cost="2"/></card>
+  <card id="children"><xi:include href="parts/names.xml" xpointer="xpointer(/names/*)"/><text>x</text>
+    <monster hp="3" atk="1"/></card>
+  <xi:include href="parts/cards.xml" xpointer="xpointer(/cards/card)"/>
+</cards>
+"""
+INCLUDE_PARTS = {
+    "effect.txt": "Vložený text efektu",
+    "names.xml": "<names><name>Jméno z fragmentu</name><subtitle>Podtitul</subtitle></names>",
+    "cards.xml": '<cards xmlns:xi="http://www.w3.org/2001/XInclude"><card id="shared"><name>Sdílená</name>'
+                 '<text><xi:include href="effect.txt" parse="text"/></text><loot lootType="coin" cost="1"/></card></cards>',
+}
+
+
+def check_stream_parity(tmp: str) -> None:
+    """Exit unless streaming reads the XInclude deck exactly like `parse_card_runs()`."""
+    from deck_pdf_generator import parser
+
+    os.makedirs(os.path.join(tmp, "parts"), exist_ok=True)
+    for name, content in INCLUDE_PARTS.items():
+        with open(os.path.join(tmp, "parts", name), "w", encoding="utf-8") as f:
+            f.write(content)
+    xml_path = os.path.join(tmp, "includes.xml")
+    with open(xml_path, "w", encoding="utf-8") as f:
+        f.write(INCLUDE_DECK)
+    expected = parser.parse_card_runs(xml_path)
+    for huge_tree in (False, True):
+        if list(parser.iter_card_runs(xml_path, huge_tree=huge_tree)) != expected:
+            raise SystemExit(f"iter_card_runs(huge_tree={huge_tree}) differs from parse_card_runs() on {xml_path}")
+    print(f"Streaming parity: {len(expected)} cards with XIncludes read identically")
+
+
+def legacy_parse_cards(xml_path: str):
+    """The pre-native lxml path: serialize and re-parse with ElementTree."""
+    import xml.etree.ElementTree as ET
+    from lxml import etree as LET  # type: ignore
+    from deck_pdf_generator import parser
+
+    ltree = LET.parse(xml_path)
+    ltree.xinclude()
+    root = ET.fromstring(LET.tostring(ltree))
+    cards = []
+    for node in root.findall("card"):
+        card = parser._card_from_node(node, len(cards))
+        for _ in range(card.count):
+            cards.append(dataclasses.replace(card))
+    return cards
+
+
+def run_mode(mode: str, xml_path: str) -> dict:
+    from deck_pdf_generator import parser
+
+    func = legacy_parse_cards if mode == "legacy" else parser.parse_cards
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    cards = func(xml_path)
+    elapsed = time.perf_counter() - t0
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"mode": mode, "cards": len(cards), "seconds": elapsed,
+            "peak_rss_mb": rss_after / 1024.0, "rss_growth_mb": (rss_after - rss_before) / 1024.0}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cards", type=int, default=100000, help="Number of <card> elements to generate")
+    ap.add_argument("--mode", choices=["legacy", "native"], help=argparse.SUPPRESS)
+    ap.add_argument("--xml", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.xml)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_stream_parity(tmp)
+        xml_path = os.path.join(tmp, "deck.xml")
+        write_deck(xml_path, args.cards)
+        size_mb = os.path.getsize(xml_path) / (1024.0 * 1024.0)
+        print(f"Synthetic deck: {args.cards} <card> elements, {size_mb:.1f} MB")
+        for mode in ("legacy", "native"):
+            out = subprocess.check_output([sys.executable, __file__, "--mode", mode, "--xml", xml_path])
+            r = json.loads(out)
+            print(f"{r['mode']:>7}: {r['seconds']:.3f} s, peak RSS {r['peak_rss_mb']:.1f} MB "
+                  f"(+{r['rss_growth_mb']:.1f} MB during parse), {r['cards']} cards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Compare `CardTable` column operations with loops over `Card` objects.
+
+A synthetic corpus of card runs is loaded into a `table.CardTable` and
+queried with `histogram()`, `filter()`, `group_rows()`, `take()` and
+`concat()`. Every result must equal the same query written as a plain
+Python loop over the runs; the script reports the time of both.
+
+Usage: python benchmarks/bench_table.py [--cards N] [--repeat R]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deck_pdf_generator import table  # noqa: E402
+from deck_pdf_generator.types import Card  # noqa: E402
+
+DECKS = (None, "monster", "biome", "npc", "quest")
+TYPES = ("coin", "item", "ability", "monster")
+
+
+def runs(n: int) -> list:
+    out = []
+    for i in range(n):
+        card = Card(id=f"card_{i}", type=TYPES[i % len(TYPES)], cost=(i % 7 if i % 5 else None),
+                    name=f"Karta {i}", subtitle="", effect="Získej 1 minci.", deck=DECKS[i % len(DECKS)],
+                    hp=(3_000_000_000 + i if i % 11 == 0 else None), count=1 + i % 3,
+                    tags=("boss",) if i % 13 == 0 else ())
+        out.append((card, card.count))
+    return out
+
+
+def best_of(repeat: int, fn):
+    best = result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def loop_histogram(corpus: list) -> Counter:
+    counts: Counter = Counter()
+    for card, n in corpus:
+        counts[card.deck or "loot"] += n
+    return counts
+
+
+def loop_filter(corpus: list) -> list:
+    return [card.id for card, _ in corpus if card.deck == "monster" and card.cost == 3]
+
+
+def loop_groups(corpus: list) -> dict:
+    groups: dict = {}
+    for i, (card, _) in enumerate(corpus):
+        groups.setdefault(card.type, []).append(i)
+    return groups
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cards", type=int, default=200000, help="Number of unique cards in the corpus")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per method; the best time is reported")
+    args = ap.parse_args()
+
+    corpus = runs(args.cards)
+    t0 = time.perf_counter()
+    t = table.CardTable.from_runs(corpus)
+    print(f"Corpus: {len(t)} unique cards, table built in {time.perf_counter() - t0:.3f} s "
+          f"(NumPy {'on' if table.np is not None else 'off'})")
+
+    checks = [
+        ("histogram(deck)", lambda: loop_histogram(corpus), lambda: t.histogram("deck", default="loot"), None),
+        ("filter(deck, cost)", lambda: loop_filter(corpus),
+         lambda: t.filter(deck="monster", cost="3"), lambda r: r.text["id"]),
+        ("group_rows(type)", lambda: loop_groups(corpus), lambda: t.group_rows("type"),
+         lambda r: {k: list(map(int, v)) for k, v in r.items()}),
+    ]
+    for name, loop, columnar, convert in checks:
+        base, expected = best_of(args.repeat, loop)
+        fast, got = best_of(args.repeat, columnar)
+        if (convert(got) if convert else got) != expected:
+            raise SystemExit(f"CardTable.{name} differs from the loop over cards")
+        print(f"{name:>20}: loop {base * 1e3:8.1f} ms, table {fast * 1e3:7.1f} ms ({base / fast:.1f}x)")
+
+    half = len(corpus) // 2
+    merged = table.CardTable.concat([table.CardTable.from_runs(corpus[:half]),
+                                     table.CardTable.from_runs(corpus[half:])])
+    if list(merged.to_runs()) != corpus or list(t.take(range(len(t))).to_runs()) != corpus:
+        raise SystemExit("concat() / take() do not round-trip the corpus")
+    print("concat() and take() round-trip the corpus")
+
+
+if __name__ == "__main__":
+    main()
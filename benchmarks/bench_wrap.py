@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare wrapping card effect texts one by one with the batched `render.wrap_texts()`.
+
+A synthetic deck of distinct Czech effect texts (with icon glyphs the
+body font lacks) is wrapped to the card body width with the fallback
+font chain used for drawing, by `render.wrap_text()` per text and by
+`wrap_texts()`, which measures the font runs of every distinct word of
+the deck in one NumPy pass per font. Both must produce the same lines,
+and every line of several words must fit when measured as drawn.
+
+Usage: python benchmarks/bench_wrap.py [--cards N] [--repeat R]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfgen import canvas  # noqa: E402
+from deck_pdf_generator import config, fonts, render  # noqa: E402
+
+WORDS = ("Získej útok obrana zranění příšera kořist mince lízni karta odhoď kolo nepřítel zemře "
+         "čarodějnice les hory bažina ďábelský úder štít meč sekyra luk šíp jed oheň led "
+         "všechny každý jednou dvakrát navíc pokud když dokud ❤️ ⚔ 1 2 3 4 5 +1 +2 -1").split()
+
+
+def effects(n: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    texts = []
+    for i in range(n):
+        sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))).capitalize() + "."
+                     for _ in range(rng.randint(1, 3))]
+        texts.append("\\n".join(sentences) + f" ({i})")
+    return texts
+
+
+def best_of(repeat: int, fn):
+    best = result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cards", type=int, default=50000, help="Number of distinct effect texts")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per method; the best time is reported")
+    args = ap.parse_args()
+
+    font_set = fonts.load_fonts(None)
+    font = font_set.regular
+    chain = font_set.chain(font)
+    size = config.BODY_SIZE
+    width = config.CARD_W - 2 * config.PADDING
+    c = canvas.Canvas(os.devnull)
+    texts = effects(args.cards)
+    print(f"{args.cards} effect texts, {sum(len(t.split()) for t in texts) / args.cards:.1f} words on average"
+          f" ({'with' if fonts.np is not None else 'without'} NumPy)")
+
+    single, expected = best_of(args.repeat, lambda: [render.wrap_text(c, t, width, font, size, chain=chain)
+                                                     for t in texts])
+    batched, lines = best_of(args.repeat, lambda: render.wrap_texts(c, texts, width, font, size, chain))
+    if lines != expected:
+        raise SystemExit("wrap_texts() wrapped some text differently from wrap_text()")
+    for line in (ln for text_lines in lines for ln in text_lines if " " in ln):
+        drawn = sum(fonts.measure(run, f, size) for f, run in fonts.segment(line, chain))
+        if drawn > width + 1e-6:
+            raise SystemExit(f"{line!r} is {drawn:.2f} pt wide when drawn, more than {width:.2f} pt")
+    print(f"wrap_text per card: {single:.3f} s")
+    print(f"        wrap_texts: {batched:.3f} s ({single / batched:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
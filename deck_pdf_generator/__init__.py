@@ -5,4 +5,12 @@ __all__ = [
     "fonts",
     "parser",
     "render",
+    "cache",
+    "validate",
+    "pipeline",
+    "table",
+    "query",
+    "deckpack",
+    "store",
+    "xinclude",
 ]
@@ -0,0 +1,117 @@
+import os
+import pickle
+import hashlib
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from .types import CardRun
+from .query import CardIndex
+from . import config
+from . import parser
+from . import xinclude
+
+# Bump whenever the pickled layout (Card fields, parser rules) changes
+CACHE_VERSION = 4
+DEFAULT_CACHE_DIR = ".cache"
+
+# Hit / miss counters for the current process
+STATS: Counter = Counter()
+
+_digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of `path`, or "" if it does not exist.
+
+    Digests are memoized per process by (mtime, size).
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _digests.get(path)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _digests[path] = (stamp, digest)
+    return digest
+
+
+def _entry_path(xml_path: str, cache_dir: str, config_path: str) -> str:
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}\0{os.path.abspath(xml_path)}\0{','.join(parser.VARIANTS)}\0".encode("utf-8"))
+    h.update(file_digest(xml_path).encode("ascii"))
+    h.update(file_digest(config_path).encode("ascii"))
+    return os.path.join(cache_dir, "cards", h.hexdigest() + ".pickle")
+
+
+def read_entry(path: str, version: int = CACHE_VERSION) -> Optional[dict]:
+    """Return the pickled dict at `path`, or None if it is missing, unreadable or not of `version`."""
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning("Ignoring unreadable cache entry %s: %s", path, e)
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != version:
+        return None
+    return entry
+
+
+def write_entry(path: str, entry: dict) -> None:
+    """Atomically pickle `entry` to `path`; failures are logged, not raised."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        logging.warning("Could not write cache entry %s: %s", path, e)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def load_card_index(xml_path: str, cache_dir: str = DEFAULT_CACHE_DIR,
+                    config_path: Optional[str] = None) -> CardIndex:
+    """Return a `CardIndex` over `parser.parse_file_card_runs(xml_path)`, served from disk when possible.
+
+    Entries are keyed by the content of `xml_path` and `config_path`
+    (icons.xml) and record the digest of every XInclude'd file, as found
+    in the `xinclude` dependency graph while parsing; any change to one of
+    them invalidates the entry. A hit records those files in the graph in
+    turn. The query index and its `CardTable` are stored with the runs,
+    so warm lookups and deck statistics never rebuild them.
+    """
+    entry_path = _entry_path(xml_path, cache_dir, config_path or config.config_path())
+    entry = read_entry(entry_path)
+    if entry is not None and all(file_digest(p) == d for p, d in entry["deps"].items()):
+        STATS["hit"] += 1
+        logging.info("Cache hit for %s", xml_path)
+        xinclude.record(xml_path, entry["deps"])
+        return entry["index"]
+
+    STATS["miss"] += 1
+    logging.info("Cache miss for %s", xml_path)
+    index = CardIndex(parser.parse_file_card_runs(xml_path))
+    # built now so that it is stored in the entry
+    index.table
+    # parsing recorded the includes of the deck and of its fragments
+    deps = {p: file_digest(p) for p in xinclude.dependencies(xml_path)}
+    write_entry(entry_path, {"version": CACHE_VERSION, "deps": deps, "index": index})
+    return index
+
+
+def load_card_runs(xml_path: str, cache_dir: str = DEFAULT_CACHE_DIR,
+                   config_path: Optional[str] = None) -> List[CardRun]:
+    """Return `parser.parse_file_card_runs(xml_path)`, served from disk when possible."""
+    return load_card_index(xml_path, cache_dir, config_path).runs
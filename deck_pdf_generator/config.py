@@ -1,7 +1,8 @@
 import os
+import logging
 import xml.etree.ElementTree as ET
-from reportlab.lib import colors as rl_colors
-from typing import Dict, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 
@@ -40,64 +41,175 @@ FONT_PATH_REG = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
 FONT_PATH_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
 
 # Icon / type mappings loaded from config files
+ICONS_PATH = os.path.join("cards", "config", "icons.xml")
 
-def load_type_icons(path: str = os.path.join("cards", "config", "icons.xml")) -> Dict[str, str]:
-    icons: Dict[str, str] = {}
+
+def _parse_icons(path: str) -> Optional[ET.Element]:
     try:
-        tree = ET.parse(path)
-        root = tree.getroot()
-        for t in root.findall("type"):
-            name = t.attrib.get("name")
-            icon = t.attrib.get("icon")
-            if name and icon:
-                icons[name] = icon
-    except Exception:
-        pass
+        return ET.parse(path).getroot()
+    except FileNotFoundError:
+        logging.warning("Icon config %s not found; rendering without configured icons", path)
+    except (OSError, ET.ParseError) as e:
+        logging.warning("Cannot read icon config %s: %s", path, e)
+    return None
+
+
+def _type_icons(root: ET.Element) -> Dict[str, str]:
+    icons: Dict[str, str] = {}
+    for t in root.findall("type"):
+        name = t.attrib.get("name")
+        icon = t.attrib.get("icon")
+        if name and icon:
+            icons[name] = icon
     return icons
 
 
-def load_front_icons(path: str = os.path.join("cards", "config", "icons.xml")) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str], Dict[str, object], Dict[str, str]]:
+def _front_icons(root: ET.Element) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str], Dict[str, object], Dict[str, str]]:
+    # reportlab.lib.colors is slow to import; only pay for it when a config is loaded
+    from reportlab.lib import colors as rl_colors
+
     deck_front_map = {}
     deck_back_map = {}
     loot_map = {}
     deck_colors: Dict[str, object] = {}
     biome_map: Dict[str, str] = {}
-    try:
-        tree = ET.parse(path)
-        root = tree.getroot()
-        for d in root.findall("deck"):
-            name = d.attrib.get("name")
-            front = d.attrib.get("front")
-            back = d.attrib.get("back")
-            color = d.attrib.get("color")
+    for d in root.findall("deck"):
+        name = d.attrib.get("name")
+        front = d.attrib.get("front")
+        back = d.attrib.get("back")
+        color = d.attrib.get("color")
+        if name and front:
+            deck_front_map[name] = front
+        if name and back:
+            deck_back_map[name] = back
+        if name and color:
+            try:
+                deck_colors[name] = rl_colors.HexColor(color)
+            except Exception:
+                logging.warning("Ignoring invalid color %r of deck %s", color, name)
+    ld = root.find("lootDefaults")
+    if ld is not None:
+        for lt in ld.findall("lootType"):
+            name = lt.attrib.get("name")
+            front = lt.attrib.get("front")
             if name and front:
-                deck_front_map[name] = front
-            if name and back:
-                deck_back_map[name] = back
-            if name and color:
-                try:
-                    deck_colors[name] = rl_colors.HexColor(color)
-                except Exception:
-                    # ignore invalid color values
-                    pass
-        ld = root.find("lootDefaults")
-        if ld is not None:
-            for lt in ld.findall("lootType"):
-                name = lt.attrib.get("name")
-                front = lt.attrib.get("front")
-                if name and front:
-                    loot_map[name] = front
-        bd = root.find("biomeSpecific")
-        if bd is not None:
-            for b in bd.findall("biome"):
-                name = b.attrib.get("name")
-                ico = b.attrib.get("icone") or b.attrib.get("icone")
-                if name and ico:
-                    biome_map[name] = ico
-    except Exception:
-        pass
+                loot_map[name] = front
+    bd = root.find("biomeSpecific")
+    if bd is not None:
+        for b in bd.findall("biome"):
+            name = b.attrib.get("name")
+            ico = b.attrib.get("icone")
+            if name and ico:
+                biome_map[name] = ico
     return deck_front_map, deck_back_map, loot_map, deck_colors, biome_map
 
-# Load globals
-TYPE_ICONS = load_type_icons()
-FRONT_DECK_ICONS, BACK_DECK_ICONS, LOOT_FRONT_DEFAULTS, DECK_COLORS, FRONT_BIOME_ICONS = load_front_icons()
+
+def load_type_icons(path: str = ICONS_PATH) -> Dict[str, str]:
+    root = _parse_icons(path)
+    return _type_icons(root) if root is not None else {}
+
+
+def load_front_icons(path: str = ICONS_PATH) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str], Dict[str, object], Dict[str, str]]:
+    root = _parse_icons(path)
+    return _front_icons(root) if root is not None else ({}, {}, {}, {}, {})
+
+
+@dataclass(frozen=True)
+class Config:
+    """Icon and color mappings read from an icons.xml file."""
+    path: str
+    type_icons: Dict[str, str] = field(default_factory=dict)
+    front_deck_icons: Dict[str, str] = field(default_factory=dict)
+    back_deck_icons: Dict[str, str] = field(default_factory=dict)
+    loot_front_defaults: Dict[str, str] = field(default_factory=dict)
+    deck_colors: Dict[str, object] = field(default_factory=dict)
+    front_biome_icons: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Config":
+        """Parse `path` once; a missing or broken file gives empty mappings."""
+        root = _parse_icons(path)
+        if root is None:
+            return cls(path)
+        return cls(path, _type_icons(root), *_front_icons(root))
+
+
+@dataclass(frozen=True)
+class Layout:
+    """Page grid, card geometry and type sizes; defaults are the constants above."""
+    page_size: Tuple[float, float] = PAGE_SIZE
+    card_w: float = CARD_W
+    card_h: float = CARD_H
+    grid_cols: int = GRID_COLS
+    grid_rows: int = GRID_ROWS
+    page_margin_left: float = PAGE_MARGIN_LEFT
+    page_margin_right: float = PAGE_MARGIN_RIGHT
+    page_margin_y: float = PAGE_MARGIN_Y
+    gap_x: float = GAP_X
+    gap_y: float = GAP_Y
+    border_radius: float = BORDER_RADIUS
+    padding: float = PADDING
+    header_h: float = HEADER_H
+    footer_h: float = FOOTER_H
+    icon_size: float = ICON_SIZE
+    title_size: int = TITLE_SIZE
+    subtitle_size: int = SUBTITLE_SIZE
+    body_size: int = BODY_SIZE
+    cost_size: int = COST_SIZE
+    meta_size: int = META_SIZE
+    stat_size: int = STAT_SIZE
+
+
+# Loaded configs keyed by absolute path: ((mtime_ns, size) or None, Config)
+_CONFIGS: Dict[str, Tuple[Optional[Tuple[int, int]], Config]] = {}
+_active_path = ICONS_PATH
+
+
+def set_config_path(path: str) -> None:
+    """Make `path` the icons.xml used when no explicit path is given."""
+    global _active_path
+    _active_path = path
+
+
+def config_path() -> str:
+    """Return the path of the active icons.xml."""
+    return _active_path
+
+
+def load_config(path: Optional[str] = None) -> Config:
+    """Return the `Config` for `path` (default: the active config).
+
+    The file is parsed on first use and again only when its mtime or size
+    changes, so a long-running process picks up edits without a restart.
+    """
+    path = path or _active_path
+    try:
+        st = os.stat(path)
+        stamp: Optional[Tuple[int, int]] = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    key = os.path.abspath(path)
+    hit = _CONFIGS.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    cfg = Config.from_file(path)
+    _CONFIGS[key] = (stamp, cfg)
+    return cfg
+
+
+# Former module-level globals, now read from the active config on access
+_LEGACY_NAMES = {
+    "TYPE_ICONS": "type_icons",
+    "FRONT_DECK_ICONS": "front_deck_icons",
+    "BACK_DECK_ICONS": "back_deck_icons",
+    "LOOT_FRONT_DEFAULTS": "loot_front_defaults",
+    "DECK_COLORS": "deck_colors",
+    "FRONT_BIOME_ICONS": "front_biome_icons",
+}
+
+
+def __getattr__(name: str):
+    field_name = _LEGACY_NAMES.get(name)
+    if field_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(load_config(), field_name)
@@ -0,0 +1,172 @@
+"""Compiled binary deck container (`.deckpack`).
+
+Layout (little-endian):
+
+    header    magic "DPAK", u16 version, u16 reserved,
+              u32 record count, u32 string count, u32 string data size
+    offsets   (string count + 1) x u32 offsets into string data
+    strings   UTF-8 string data
+    records   record count x fixed-width card records
+
+A record holds one card run: a u32 string-table reference for every text
+field (0xFFFFFFFF for None, tags joined by ","), an i64 for every integer
+field (-2**63 for None) and the u32 run multiplicity.
+"""
+import os
+import mmap
+import struct
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+from .types import Card, CardRun
+
+MAGIC = b"DPAK"
+VERSION = 2
+EXTENSION = ".deckpack"
+
+STR_FIELDS = ("id", "type", "name", "subtitle", "effect", "biome", "back_icon", "school",
+              "slot", "klass", "front_icon", "deck", "tags")
+INT_FIELDS = ("cost", "hp", "atk", "lootBudget", "count")
+
+NO_STRING = 0xFFFFFFFF
+NULL = -2 ** 63
+INT_MAX = 2 ** 63 - 1
+MAX_COUNT = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<4sHHIII")
+_RECORD = struct.Struct("<" + "I" * len(STR_FIELDS) + "q" * len(INT_FIELDS) + "I")
+
+
+def write_deckpack(runs: Iterable[CardRun], out_path: str) -> int:
+    """Compile card `runs` into a `.deckpack` file at `out_path`.
+
+    Returns the number of records written. Raises ValueError for integer
+    fields outside the signed 64-bit range or run counts that do not fit
+    32 bits; nothing is written then.
+    """
+    strings: Dict[str, int] = {}
+    records: List[bytes] = []
+
+    def ref(value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        idx = strings.get(value)
+        if idx is None:
+            idx = strings[value] = len(strings)
+        return idx
+
+    for card, n in runs:
+        values = []
+        for f in STR_FIELDS:
+            value = getattr(card, f)
+            values.append(ref(",".join(value) if f == "tags" else value))
+        for f in INT_FIELDS:
+            value = getattr(card, f)
+            if value is not None and not NULL < value <= INT_MAX:
+                raise ValueError(f"Card {card.id!r}: {f}={value} does not fit a 64-bit deckpack field")
+            values.append(NULL if value is None else value)
+        if not 0 <= n <= MAX_COUNT:
+            raise ValueError(f"Card {card.id!r}: {n} copies do not fit a deckpack record")
+        values.append(n)
+        records.append(_RECORD.pack(*values))
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, len(records), len(encoded), offsets[-1]))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.writelines(encoded)
+        f.writelines(records)
+    os.replace(tmp, out_path)
+    return len(records)
+
+
+class DeckPack:
+    """Read-only, memory-mapped view of a `.deckpack` file.
+
+    Nothing is decoded up front: `run(i)` unpacks a single record and
+    builds its `Card` on access, and strings are decoded once per pack.
+    Iterating a pack yields printed cards (copies of a run are the same
+    instance), so it can be passed to `render.render_pdf()` directly.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self._count, n_strings, data_size = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a deckpack file")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported deckpack version {version}")
+        self._offsets_at = _HEADER.size
+        self._data_at = self._offsets_at + 4 * (n_strings + 1)
+        self._records_at = self._data_at + data_size
+        self._strings: Dict[int, str] = {}
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "DeckPack":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _string(self, idx: int) -> Optional[str]:
+        if idx == NO_STRING:
+            return None
+        s = self._strings.get(idx)
+        if s is None:
+            start, end = struct.unpack_from("<II", self._mm, self._offsets_at + 4 * idx)
+            s = self._strings[idx] = self._mm[self._data_at + start:self._data_at + end].decode("utf-8")
+        return s
+
+    def _record(self, i: int) -> tuple:
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return _RECORD.unpack_from(self._mm, self._records_at + i * _RECORD.size)
+
+    def run(self, i: int) -> CardRun:
+        values = self._record(i)
+        kwargs = {}
+        for j, f in enumerate(STR_FIELDS):
+            kwargs[f] = self._string(values[j])
+        tags = kwargs["tags"]
+        kwargs["tags"] = tuple(tags.split(",")) if tags else ()
+        for j, f in enumerate(INT_FIELDS, len(STR_FIELDS)):
+            kwargs[f] = None if values[j] == NULL else values[j]
+        return Card(**kwargs), values[-1]
+
+    def runs(self) -> Iterator[CardRun]:
+        for i in range(self._count):
+            yield self.run(i)
+
+    def __iter__(self) -> Iterator[Card]:
+        for card, n in self.runs():
+            for _ in range(n):
+                yield card
+
+    def histogram(self, field: str, default: Optional[str] = None) -> Counter:
+        """Count printed cards per value of a string `field` without building Cards."""
+        j = STR_FIELDS.index(field)
+        counts: Counter = Counter()
+        for i in range(self._count):
+            values = self._record(i)
+            counts[values[j]] += values[-1]
+        out: Counter = Counter()
+        for idx, n in counts.items():
+            value = self._string(idx)
+            out[default if value is None else value] += n
+        return out
+
+
+def is_deckpack(path) -> bool:
+    return isinstance(path, str) and path.lower().endswith(EXTENSION)
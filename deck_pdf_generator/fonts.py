@@ -1,8 +1,20 @@
 import os
+import hashlib
+import functools
 import logging
-from typing import Optional, List
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
+import reportlab
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase.ttfonts import TTFont, TTFontFace
+from . import cache
+
+try:
+    import numpy as np  # type: ignore
+except Exception:
+    np = None
 
 # Defaults (may be overridden)
 FONT_REG = "DejaVuSans"
@@ -14,10 +26,145 @@ FONT_PATH_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
 ICON_FONT = "Symbola"
 ICON_FONT_PATH: Optional[str] = None
 
+# Names the TTF fonts are registered under; FONT_REG/FONT_BOLD may fall back to built-ins
+_REG_NAME, _BOLD_NAME = FONT_REG, FONT_BOLD
+
+# Further fonts tried, in order, for glyphs neither the text nor the icon font has
+FALLBACK_FONTS = [
+    ("NotoSansSymbols2", "/usr/share/fonts/truetype/noto/NotoSansSymbols2-Regular.ttf"),
+    ("NotoSansSymbols", "/usr/share/fonts/truetype/noto/NotoSansSymbols-Regular.ttf"),
+    ("FreeSerif", "/usr/share/fonts/truetype/freefont/FreeSerif.ttf"),
+]
+
+# Joiners and variation selectors stay in the font of the character they modify
+_COMBINING = frozenset("\u200d\ufe0e\ufe0f")
+# Distinct (text, font chain) segmentations kept by segment()
+SEGMENT_CACHE_SIZE = 8192
+
+
+@dataclass(frozen=True)
+class FontSet:
+    """Registered font names (and their files) to render with."""
+    regular: str
+    bold: str
+    # font for icon glyphs: the icon font when one was found, else `regular`
+    icon: str
+    regular_path: Optional[str] = None
+    bold_path: Optional[str] = None
+    icon_path: Optional[str] = None
+    # registered `FALLBACK_FONTS`
+    fallbacks: Tuple[str, ...] = ()
+
+    def chain(self, primary: str) -> Tuple[str, ...]:
+        """Return `primary` followed by the fonts to try for glyphs it lacks."""
+        return (primary,) + tuple(f for f in (self.regular, self.icon) + self.fallbacks if f != primary)
+
+
+# Bump whenever the pickled font layout changes
+FONT_CACHE_VERSION = 1
+
+# reportlab's font registry is process-global
+_REGISTER_LOCK = threading.Lock()
+_fonts: Optional[FontSet] = None
+
+
+def _font_entry_path(path: str, cache_dir: str) -> Optional[str]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = f"v{FONT_CACHE_VERSION}\0{reportlab.Version}\0{os.path.abspath(path)}\0{st.st_mtime_ns}\0{st.st_size}"
+    return os.path.join(cache_dir, "fonts", hashlib.sha256(key.encode("utf-8")).hexdigest() + ".pickle")
+
+
+def _pdf_scale(units_per_em: int):
+    if units_per_em == 1000:
+        return lambda x: x
+    factor = 1000 / units_per_em
+    return lambda x: x * factor
+
+
+def _read_font(entry_path: str, name: str, path: str) -> Optional[TTFont]:
+    entry = cache.read_entry(entry_path, FONT_CACHE_VERSION)
+    if entry is None:
+        return None
+    try:
+        face = TTFontFace.__new__(TTFontFace)
+        face.__dict__.update(entry["face"])
+        # the raw file is only needed to embed font subsets, not parsed again
+        with open(path, "rb") as f:
+            face._ttf_data = f.read()
+        face._pdfScale = _pdf_scale(face.unitsPerEm)
+    except Exception as e:
+        logging.warning("Ignoring unreadable font cache entry %s: %s", entry_path, e)
+        return None
+    font = TTFont.__new__(TTFont)
+    font.__dict__.update(entry["font"])
+    font.fontName = name
+    font.face = face
+    font.state = WeakKeyDictionary()
+    return font
+
+
+def _write_font(entry_path: str, font: TTFont) -> None:
+    cache.write_entry(entry_path, {
+        "version": FONT_CACHE_VERSION,
+        "font": {k: v for k, v in vars(font).items() if k not in ("face", "state")},
+        "face": {k: v for k, v in vars(font.face).items() if k not in ("_ttf_data", "_pdfScale")},
+    })
 
-def ensure_fonts() -> None:
-    global FONT_REG, FONT_BOLD, FONT_PATH_REG, FONT_PATH_BOLD, ICON_FONT, ICON_FONT_PATH
 
+def load_ttfont(name: str, path: str, cache_dir: Optional[str] = None) -> TTFont:
+    """Return a reportlab `TTFont` named `name` for the file at `path`.
+
+    With a `cache_dir` the parsed face (cmap, widths, metrics) is kept
+    under it, keyed by the font path, mtime and size and the reportlab
+    version, so later processes skip parsing the TTF. Raises like
+    `TTFont()` when the file cannot be parsed.
+    """
+    entry_path = _font_entry_path(path, cache_dir) if cache_dir is not None else None
+    if entry_path is not None:
+        font = _read_font(entry_path, name, path)
+        if font is not None:
+            cache.STATS["font_hit"] += 1
+            return font
+        cache.STATS["font_miss"] += 1
+    font = TTFont(name, path)
+    if entry_path is not None:
+        _write_font(entry_path, font)
+    return font
+
+
+def _register(name: str, candidates: List[Optional[str]], cache_dir: Optional[str]) -> Optional[str]:
+    """Register the first loadable font of `candidates` as `name` and return its path."""
+    for p in candidates:
+        if p and os.path.exists(p):
+            try:
+                pdfmetrics.registerFont(load_ttfont(name, p, cache_dir))
+                return p
+            except Exception:
+                continue
+    return None
+
+
+def load_fonts(cache_dir: Optional[str] = None) -> FontSet:
+    """Register the TTF fonts with reportlab and return the names to use.
+
+    Fonts are registered once per process; later calls return the same
+    `FontSet`, whatever their `cache_dir`. Parsed fonts are only cached
+    on disk when the first call passes a `cache_dir` (see `load_ttfont()`),
+    so library use writes nothing to the working directory. Unlike
+    `ensure_fonts()` this leaves the module globals untouched, so callers
+    can hold on to the result (e.g. in a `render.RenderContext`).
+    """
+    global _fonts
+    with _REGISTER_LOCK:
+        if _fonts is None:
+            _fonts = _register_fonts(cache_dir)
+        return _fonts
+
+
+def _register_fonts(cache_dir: Optional[str]) -> FontSet:
     symbola_candidates = [
         "/usr/share/fonts/truetype/Symbola/Symbola.ttf",
         "/usr/share/fonts/truetype/symbola/Symbola.ttf",
@@ -25,109 +172,204 @@ def ensure_fonts() -> None:
         "/usr/local/share/fonts/Symbola.ttf",
         os.path.expanduser("~/.local/share/fonts/Symbola.ttf"),
     ]
+    icon_path = _register(ICON_FONT, symbola_candidates, cache_dir)
+    if icon_path:
+        logging.info("Registered icon font %s: %s", ICON_FONT, icon_path)
 
-    for p in symbola_candidates:
-        if p and os.path.exists(p):
-            try:
-                ICON_FONT_PATH = p
-                pdfmetrics.registerFont(TTFont(ICON_FONT, ICON_FONT_PATH))
-                logging.info("Registered icon font %s: %s", ICON_FONT, p)
-                break
-            except Exception:
-                ICON_FONT_PATH = None
-                continue
-
-    candidates_reg = [
+    reg_path = _register(_REG_NAME, [
         FONT_PATH_REG,
         "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
         "/usr/share/fonts/truetype/freefont/FreeSans.ttf",
-    ]
-    candidates_bold = [
+    ], cache_dir)
+    bold_path = _register(_BOLD_NAME, [
         FONT_PATH_BOLD,
         "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
         "/usr/share/fonts/truetype/freefont/FreeSansBold.ttf",
-    ]
-
-    reg_registered = False
-    for p in candidates_reg:
-        if p and os.path.exists(p):
-            try:
-                FONT_PATH_REG = p
-                pdfmetrics.registerFont(TTFont(FONT_REG, p))
-                reg_registered = True
-                break
-            except Exception:
-                continue
+    ], cache_dir)
 
-    bold_registered = False
-    for p in candidates_bold:
-        if p and os.path.exists(p):
-            try:
-                FONT_PATH_BOLD = p
-                pdfmetrics.registerFont(TTFont(FONT_BOLD, p))
-                bold_registered = True
-                break
-            except Exception:
-                continue
+    fallbacks = tuple(name for name, path in FALLBACK_FONTS if _register(name, [path], cache_dir))
 
-    if not reg_registered or not bold_registered:
+    regular, bold = _REG_NAME, _BOLD_NAME
+    if reg_path is None or bold_path is None:
         logging.warning(
             "Could not register configured TTF fonts (%s / %s). Falling back to built-in fonts which may lack Unicode emoji support.",
-            FONT_PATH_REG,
-            FONT_PATH_BOLD,
+            reg_path or FONT_PATH_REG,
+            bold_path or FONT_PATH_BOLD,
         )
-        FONT_REG = "Helvetica"
-        FONT_BOLD = "Helvetica-Bold"
+        regular, bold = "Helvetica", "Helvetica-Bold"
+    return FontSet(regular, bold, ICON_FONT if icon_path else regular, reg_path, bold_path, icon_path, fallbacks)
 
 
-def check_icon_glyphs(font_path: Optional[str] = None) -> None:
+def ensure_fonts() -> None:
+    """Register fonts and publish them through the module globals (`FONT_REG`, `ICON_FONT_PATH`, …)."""
+    global FONT_REG, FONT_BOLD, FONT_PATH_REG, FONT_PATH_BOLD, ICON_FONT_PATH
+
+    fs = load_fonts()
+    FONT_REG, FONT_BOLD = fs.regular, fs.bold
+    FONT_PATH_REG = fs.regular_path or FONT_PATH_REG
+    FONT_PATH_BOLD = fs.bold_path or FONT_PATH_BOLD
+    ICON_FONT_PATH = fs.icon_path
+
+
+# Per-font advance widths in 1/1000 em: (widths by character, widths.__getitem__, default width),
+# or None for fonts that are not TrueType (measured by reportlab). The keys are
+# exactly the characters the font's cmap maps, so the dict doubles as its coverage.
+_WIDTHS: Dict[str, Optional[Tuple[Dict[str, float], Callable, float]]] = {}
+
+
+def _width_table(font_name: str) -> Optional[Tuple[Dict[str, float], Callable, float]]:
+    font = pdfmetrics.getFont(font_name)
+    table = None
+    if isinstance(font, TTFont):
+        widths = {chr(code): w for code, w in font.face.charWidths.items()}
+        table = (widths, widths.__getitem__, font.face.defaultWidth)
+    _WIDTHS[font_name] = table
+    return table
+
+
+def _units(table: Tuple[Dict[str, float], Callable, float], text: str) -> float:
+    try:
+        return sum(map(table[1], text))
+    except KeyError:
+        # characters without a glyph advance by the font's default width
+        get, default = table[0].get, table[2]
+        return sum([get(ch, default) for ch in text])
+
+
+# Dense per-font width arrays indexed by codepoint; the last entry is the default width
+_DENSE: Dict[str, object] = {}
+
+
+def _dense_table(font_name: str, table: Tuple[Dict[str, float], Callable, float]):
+    dense = _DENSE.get(font_name)
+    if dense is None:
+        widths, _, default = table
+        codes = np.fromiter(map(ord, widths), dtype=np.int64, count=len(widths))
+        dense = np.full(int(codes.max(initial=0)) + 2, default, dtype=np.float64)
+        dense[codes] = np.fromiter(widths.values(), dtype=np.float64, count=len(widths))
+        _DENSE[font_name] = dense
+    return dense
+
+
+def text_units_many(texts: Sequence[str], font_name: str) -> List[float]:
+    """Return `text_units()` of every string in `texts`, measured in one pass.
+
+    With NumPy all strings are decoded into one codepoint array, looked
+    up in a dense width array of the font and summed per string, so the
+    Python overhead is per batch rather than per string or character.
+    Without NumPy (or for built-in fonts) the strings are measured one
+    by one.
+    """
     try:
-        from fontTools.ttLib import TTFont  # type: ignore
-    except Exception:
-        logging.warning("fontTools not installed; cannot check icon glyph coverage. Install with 'pip install fonttools' to enable checks.")
-        return
-
-    if font_path is None:
-        # Ensure fonts are registered so ICON_FONT_PATH is set when possible
-        try:
-            ensure_fonts()
-        except Exception:
-            pass
-        # Prefer icon font when available
-        font_path = ICON_FONT_PATH or FONT_PATH_REG
+        table = _WIDTHS[font_name]
+    except KeyError:
+        table = _width_table(font_name)
+    if table is None or np is None:
+        return [text_units(text, font_name) for text in texts]
+    dense = _dense_table(font_name, table)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    sums = np.zeros(len(texts), dtype=np.float64)
+    nonempty = np.flatnonzero(lengths)
+    if len(nonempty):
+        codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+        # codepoints past the table get the default width in its last slot
+        widths = dense[np.minimum(codes, len(dense) - 1)]
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+        sums[nonempty] = np.add.reduceat(widths, starts)
+    return sums.tolist()
+
+
+def measure_many(texts: Sequence[str], font_name: str, size: float) -> List[float]:
+    """Return the width in points of every string in `texts` (see `text_units_many()`)."""
+    if coverage(font_name) is None:
+        return [pdfmetrics.stringWidth(text, font_name, size) for text in texts]
+    scale = 0.001 * size
+    return [scale * units for units in text_units_many(texts, font_name)]
+
 
+def coverage(font_name: str) -> Optional[Dict[str, float]]:
+    """Return the characters the registered font `font_name` has glyphs for (as a dict), or None if unknown.
+
+    Built once per font from its cmap, which the parsed-font cache keeps
+    on disk (see `load_ttfont()`).
+    """
     try:
-        tt = TTFont(font_path)
-    except Exception as e:
-        logging.warning("Unable to load font for glyph check: %s", e)
-        return
-
-    cmap = {}
-    for table in tt['cmap'].tables:
-        cmap.update(table.cmap)
-
-    # collect configured icons lazily to avoid circular imports
-    from . import config
-    icons = []
-    icons.extend(config.TYPE_ICONS.values())
-    icons.extend(config.FRONT_DECK_ICONS.values())
-    icons.extend(config.BACK_DECK_ICONS.values())
-    icons.extend(config.LOOT_FRONT_DEFAULTS.values())
-
-    chars = set()
-    for ic in icons:
-        if not ic:
+        table = _WIDTHS[font_name]
+    except KeyError:
+        table = _width_table(font_name)
+    return None if table is None else table[0]
+
+
+@functools.lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def segment(text: str, chain: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+    """Split `text` into (font, run) pairs for drawing with the fallback `chain`.
+
+    Every character comes from the first font of `chain` that has a
+    glyph for it; characters no font has, joiners and variation
+    selectors stay with the preceding run. Fonts without coverage data
+    (built-in fonts) are assumed to have every glyph. Memoized, so
+    drawing the same string again costs a cache lookup.
+    """
+    covers = [coverage(font) for font in chain]
+    first = covers[0]
+    if first is None or all(ch in first for ch in text):
+        return ((chain[0], text),)
+    runs: List[Tuple[str, str]] = []
+    current, start = chain[0], 0
+    for i, ch in enumerate(text):
+        if ch in _COMBINING:
             continue
-        chars.add(ic[0])
+        font = next((f for f, cov in zip(chain, covers) if cov is None or ch in cov), current)
+        if font != current:
+            if i > start:
+                runs.append((current, text[start:i]))
+            current, start = font, i
+    runs.append((current, text[start:]))
+    return tuple(runs)
+
+
+def text_units(text: str, font_name: str) -> float:
+    """Return the advance width of `text` in 1/1000 em of the registered font `font_name`.
+
+    Widths come from a table built once per font from its cmap, so this
+    is a single dict lookup per character. Results equal
+    `pdfmetrics.stringWidth(text, font_name, 1000)`.
+    """
+    try:
+        table = _WIDTHS[font_name]
+    except KeyError:
+        table = _width_table(font_name)
+    if table is None:
+        return pdfmetrics.stringWidth(text, font_name, 1000)
+    return _units(table, text)
+
+
+def measure(text: str, font_name: str, size: float) -> float:
+    """Return the width of `text` in points, like `pdfmetrics.stringWidth()` but faster."""
+    try:
+        table = _WIDTHS[font_name]
+    except KeyError:
+        table = _width_table(font_name)
+    if table is None:
+        return pdfmetrics.stringWidth(text, font_name, size)
+    return 0.001 * size * _units(table, text)
+
+
+def check_icon_glyphs(font_path: Optional[str] = None) -> None:
+    """Log the configured icon characters that no registered font can draw.
 
-    missing = []
-    for ch in sorted(chars):
-        if ord(ch) not in cmap:
-            missing.append((ch, ord(ch)))
+    Kept for compatibility: a thin wrapper over `validate.audit_glyphs()`
+    without deck files, i.e. what `--check-icons` reports for the icons.
+    Glyphs are looked up in the whole fallback chain, so `font_path` is
+    ignored.
+    """
+    # validate imports this module
+    from . import validate
 
+    missing = validate.audit_glyphs([])
     if missing:
-        logging.warning("The following icon characters are NOT present in font %s:", font_path)
-        for ch, code in missing:
-            logging.warning("  U+%04X  %r", code, ch)
+        logging.warning("The following icon characters are NOT present in any registered font:")
+        for glyph in missing:
+            logging.warning("  %s", glyph)
     else:
-        logging.info("All configured icon glyphs are present in %s", font_path)
+        logging.info("All configured icon glyphs are present in the registered fonts")
@@ -1,152 +1,538 @@
-from typing import List
+import os
+import sys
+import csv
+import json
+import logging
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 import xml.etree.ElementTree as ET
-from .types import Card
-from . import config
+from .types import Card, CardRun
+from . import config, xinclude
+from .xinclude import XINCLUDE_TAG
 
+# Variant child elements, in the order they are looked up
+VARIANTS = ("monster", "biome", "npc", "quest", "curse", "health")
+# Default front icons of variants added with register_variant(); icons.xml takes precedence
+VARIANT_ICONS: Dict[str, str] = {}
 
-def parse_cards(xml_path: str) -> List[Card]:
+# Top-level elements streamed between two checks of the memory ceiling
+RSS_CHECK_INTERVAL = 1000
+
+
+class MemoryLimitExceeded(RuntimeError):
+    """Raised when streaming a deck pushes the process over its memory ceiling."""
+
+
+class RowError(ValueError):
+    """Raised for a line of a JSONL / CSV card file that is not a card row."""
+
+    def __init__(self, path: str, line: int, message: str) -> None:
+        super().__init__(f"{path}:{line}: {message}")
+        self.path = path
+        self.line = line
+        self.message = message
+
+
+def _build_card(attrib: Mapping[str, str], name: str, subtitle: str, effect: str,
+                child: Callable[[str], Optional[Mapping[str, str]]], position: int,
+                cfg: config.Config) -> Card:
+    """Apply the card defaulting rules and build a `Card`.
+
+    `attrib` holds the `<card>` attributes and `child(tag)` returns the
+    attributes of the `<loot>`, `<monster>`, … variant child (or None).
+    `position` is the number of cards emitted before this one; it is used
+    to generate an id for cards without an explicit `id` attribute.
+    Default icons come from `cfg`.
+    """
+    cid = attrib.get("id", "").strip()
+    tags_raw = attrib.get("tags", "")
+    tags = [t.strip() for t in tags_raw.split(",") if t.strip()]
+
+    name = name.strip()
+    subtitle = subtitle.strip()
+    effect = effect.strip()
+
+    ctype = "ability"
+    cost = 0
+    school = None
+    slot = None
+    klass = None
+    front_icon = None
+    deck = None
+
+    loot = child("loot")
+    if loot is not None:
+        ctype = loot.get("lootType", ctype)
+        cost_str = loot.get("cost", None)
+        if cost_str is not None:
+            try:
+                cost = int(cost_str)
+            except ValueError:
+                cost = 0
+        school = loot.get("school", None)
+        slot = loot.get("slot", None)
+        klass = loot.get("class", None)
+        front_icon = loot.get("front_icon", None)
+        back_icon = loot.get("back_icon", None)
+        if not front_icon:
+            # prefer an icon based on school for abilities, then fallback to loot-type defaults
+            school_icon_map = {
+                "attack": "⚔️",
+                "defense": "🛡️",
+                "spell": "✨",
+                "utility": "⚙️",
+            }
+            front_icon = None
+            if school and school in school_icon_map:
+                front_icon = school_icon_map[school]
+            if not front_icon:
+                front_icon = cfg.loot_front_defaults.get(ctype)
+        deck = "loot"
+    else:
+        ctype = attrib.get("type", ctype).strip()
+        cost_str = attrib.get("cost", "0").strip()
+        try:
+            cost = int(cost_str)
+        except ValueError:
+            cost = 0
+        school = attrib.get("school", None)
+        slot = attrib.get("slot", None)
+        klass = attrib.get("class", None)
+        front_icon = attrib.get("front_icon", None)
+        back_icon = attrib.get("back_icon", None)
+        # if card-level front_icon missing, try to read it from the variant child (e.g. <biome front_icon="…"/>)
+        if not front_icon:
+            for v in VARIANTS:
+                el = child(v)
+                if el is not None:
+                    # prefer explicit attribute on the child element
+                    front_icon = el.get("front_icon") or cfg.front_deck_icons.get(v) or VARIANT_ICONS.get(v)
+                    deck = v
+                    # if no explicit `type` attribute was provided on the card,
+                    # use the variant name as the card type (e.g. npc, monster, biome)
+                    if 'type' not in attrib:
+                        ctype = v
+                    break
+
+    count_str = attrib.get("count", "1").strip()
+    try:
+        count = int(count_str)
+        if count < 1:
+            count = 1
+    except ValueError:
+        count = 1
+
+    if not cid:
+        cid = f"{ctype}_{position+1}"
+
+    # parse monster-specific stats if present
+    m = child('monster')
+    hp = None
+    atk = None
+    lootBudget = None
+    biome = None
+    if m is not None:
+        hp_str = m.get('hp')
+        atk_str = m.get('atk')
+        lb_str = m.get('lootBudget') or m.get('lootbudget')
+        biome = m.get('biome') or m.get('biome')
+        try:
+            hp = int(hp_str) if hp_str is not None else None
+        except Exception:
+            hp = None
+        try:
+            atk = int(atk_str) if atk_str is not None else None
+        except Exception:
+            atk = None
+        try:
+            lootBudget = int(lb_str) if lb_str is not None else None
+        except Exception:
+            lootBudget = None
+
+    return Card(
+        id=cid,
+        type=ctype,
+        cost=cost,
+        name=name,
+        subtitle=subtitle,
+        effect=effect,
+        hp=hp,
+        atk=atk,
+        lootBudget=lootBudget,
+        biome=biome,
+        back_icon=back_icon,
+        school=school,
+        slot=slot,
+        klass=klass,
+        front_icon=front_icon,
+        deck=deck,
+        count=count,
+        tags=tags,
+    )
+
+
+def _text(el) -> str:
+    return el.text or ""
+
+
+def _attrib(el) -> Mapping[str, str]:
+    return el.attrib
+
+
+# What to extract from each known child of <card>; anything else is ignored
+CHILD_EXTRACTORS: Dict[str, Callable] = {
+    "name": _text,
+    "subtitle": _text,
+    "text": _text,
+    "loot": _attrib,
+}
+CHILD_EXTRACTORS.update((v, _attrib) for v in VARIANTS)
+
+
+def register_variant(tag: str, front_icon: Optional[str] = None) -> None:
+    """Make `<tag>` a variant child of `<card>`, like `<monster>` or `<biome>`.
+
+    A card with it gets `deck` (and, without a `type` attribute, `type`)
+    set to `tag`; `front_icon` is the default icon for such cards. Variants
+    registered later have lower priority when a card has several.
+    """
+    global VARIANTS
+    if tag not in VARIANTS:
+        VARIANTS = VARIANTS + (tag,)
+    CHILD_EXTRACTORS[tag] = _attrib
+    if front_icon is not None:
+        VARIANT_ICONS[tag] = front_icon
+
+
+def _card_from_node(node, position: int, cfg: Optional[config.Config] = None) -> Card:
+    """Build a `Card` from a `<card>` element.
+
+    Children are read in a single pass, dispatching on their tag through
+    `CHILD_EXTRACTORS`; like `find()`, the first child with a tag wins.
+    Works with both stdlib ElementTree and lxml elements. `cfg` defaults
+    to the active config.
+    """
+    found: Dict[str, object] = {}
+    for el in node:
+        tag = el.tag
+        if tag not in found:
+            extract = CHILD_EXTRACTORS.get(tag)
+            if extract is not None:
+                found[tag] = extract(el)
+
+    return _build_card(node.attrib, found.get("name", ""), found.get("subtitle", ""),
+                       found.get("text", ""), found.get, position, cfg or config.load_config())
+
+
+# Row column aliases accepted by the JSONL / CSV loaders
+ROW_ALIASES = {"effect": "text", "klass": "class", "variant": "deck"}
+_LOOT_COLUMNS = ("lootType", "cost", "school", "slot", "class", "front_icon", "back_icon")
+_MONSTER_COLUMNS = ("hp", "atk", "lootBudget", "biome")
+
+
+def _cell_text(value) -> str:
+    """Spell a JSON value the way it would be written in an XML attribute."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        # JSON writers often emit 2.0 for integer columns
+        return str(int(value))
+    return str(value)
+
+
+def _normalize_row(row: Mapping) -> Dict[str, str]:
+    """Turn a JSON object or CSV row into string attributes; empty cells are dropped."""
+    out: Dict[str, str] = {}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ",".join(_cell_text(v) for v in value)
+        value = _cell_text(value)
+        if not value.strip():
+            continue
+        key = key.strip()
+        out[ROW_ALIASES.get(key, key)] = value
+    return out
+
+
+def _card_from_row(row: Mapping, position: int, cfg: Optional[config.Config] = None) -> Card:
+    """Build a `Card` from a flat row, using the same rules as `<card>` elements.
+
+    Columns use the XML attribute names (`id`, `type`, `cost`, `count`,
+    `tags`, `school`, `slot`, `class`, `front_icon`, `back_icon`) plus
+    `name`, `subtitle`, `text`. A `lootType` column (or `deck=loot`) makes a
+    loot card; `deck` naming a variant (monster, biome, …) plays the role
+    of the variant child element, and `hp`, `atk`, `lootBudget`, `biome`
+    are monster stats.
+    """
+    attrib = _normalize_row(row)
+    deck = attrib.get("deck")
+    children: Dict[str, Dict[str, str]] = {}
+    if "lootType" in attrib or deck == "loot":
+        children["loot"] = {k: attrib[k] for k in _LOOT_COLUMNS if k in attrib}
+    elif deck in VARIANTS:
+        # the icon belongs to the variant, as in <monster front_icon="…"/>
+        variant = children[deck] = {}
+        if "front_icon" in attrib:
+            variant["front_icon"] = attrib.pop("front_icon")
+    if deck == "monster" or (deck is None and any(k in attrib for k in ("hp", "atk", "lootBudget"))):
+        children.setdefault("monster", {}).update((k, attrib[k]) for k in _MONSTER_COLUMNS if k in attrib)
+
+    return _build_card(attrib, attrib.get("name", ""), attrib.get("subtitle", ""), attrib.get("text", ""),
+                       children.get, position, cfg or config.load_config())
+
+
+def _runs_from_rows(rows: Iterable[Mapping]) -> Iterator[CardRun]:
+    cfg = config.load_config()
+    emitted = 0
+    for row in rows:
+        card = _card_from_row(row, emitted, cfg)
+        yield card, card.count
+        emitted += card.count
+
+
+def _numbered_jsonl_rows(path: str) -> Iterator[Tuple[int, Mapping]]:
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise RowError(path, lineno, f"invalid JSON: {e}") from None
+            if not isinstance(row, dict):
+                raise RowError(path, lineno, "expected a JSON object per line")
+            yield lineno, row
+
+
+def _numbered_csv_rows(path: str) -> Iterator[Tuple[int, Mapping]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            # line_num is the last line of the record (quoted cells may span lines)
+            yield reader.line_num, row
+
+
+def _jsonl_rows(path: str) -> Iterator[Mapping]:
+    return (row for _, row in _numbered_jsonl_rows(path))
+
+
+def _csv_rows(path: str) -> Iterator[Mapping]:
+    return (row for _, row in _numbered_csv_rows(path))
+
+
+def iter_jsonl_card_runs(path: str) -> Iterator[CardRun]:
+    """Stream `(card, multiplicity)` runs from a JSON Lines file, one card object per line."""
+    return _runs_from_rows(_jsonl_rows(path))
+
+
+def iter_csv_card_runs(path: str) -> Iterator[CardRun]:
+    """Stream `(card, multiplicity)` runs from a CSV file with a header row."""
+    return _runs_from_rows(_csv_rows(path))
+
+
+def parse_card_runs(xml_path: str) -> List[CardRun]:
+    """Parse `xml_path` into `(card, multiplicity)` runs.
+
+    Each `<card count="N">` yields a single `Card` paired with N, so memory
+    scales with unique cards rather than printed cards.
+    """
     try:
         from lxml import etree as LET  # type: ignore
     except Exception:
+        # stdlib fallback: no XInclude support
         tree = ET.parse(xml_path)
         root = tree.getroot()
     else:
+        # lxml elements expose the same attrib/find/findtext API, so cards
+        # are read straight from the XInclude-resolved tree; shared
+        # fragments are parsed once per process
         ltree = LET.parse(xml_path)
         try:
-            ltree.xinclude()
+            xinclude.resolve(ltree, xml_path)
         except Exception:
             pass
-        xml_bytes = LET.tostring(ltree)
-        root = ET.fromstring(xml_bytes)
+        root = ltree.getroot()
 
-    cards: List[Card] = []
+    runs: List[CardRun] = []
+    cfg = config.load_config()
+    emitted = 0
 
     for node in root.findall("card"):
-        cid = node.attrib.get("id", "").strip()
-        tags_raw = node.attrib.get("tags", "")
-        tags = [t.strip() for t in tags_raw.split(",") if t.strip()]
-
-        name = (node.findtext("name") or "").strip()
-        subtitle = (node.findtext("subtitle") or "").strip()
-        effect = (node.findtext("text") or "").strip()
-
-        ctype = "ability"
-        cost = 0
-        school = None
-        slot = None
-        klass = None
-        front_icon = None
-        deck = None
-
-        loot = node.find("loot")
-        if loot is not None:
-            ctype = loot.attrib.get("lootType", ctype)
-            cost_str = loot.attrib.get("cost", None)
-            if cost_str is not None:
-                try:
-                    cost = int(cost_str)
-                except ValueError:
-                    cost = 0
-            school = loot.attrib.get("school", None)
-            slot = loot.attrib.get("slot", None)
-            klass = loot.attrib.get("class", None)
-            front_icon = loot.attrib.get("front_icon", None)
-            back_icon = loot.attrib.get("back_icon", None)
-            if not front_icon:
-                # prefer an icon based on school for abilities, then fallback to loot-type defaults
-                school_icon_map = {
-                    "attack": "⚔️",
-                    "defense": "🛡️",
-                    "spell": "✨",
-                    "utility": "⚙️",
-                }
-                front_icon = None
-                if school and school in school_icon_map:
-                    front_icon = school_icon_map[school]
-                if not front_icon:
-                    front_icon = config.LOOT_FRONT_DEFAULTS.get(ctype)
-            deck = "loot"
+        card = _card_from_node(node, emitted, cfg)
+        runs.append((card, card.count))
+        emitted += card.count
+
+    return runs
+
+
+def expand_runs(runs: Iterable[CardRun]) -> Iterator[Card]:
+    """Lazily expand `(card, multiplicity)` runs into printed cards.
+
+    Copies of a run are the same `Card` instance, which lets the renderer
+    lay a run out once and place it repeatedly.
+    """
+    for card, n in runs:
+        for _ in range(n):
+            yield card
+
+
+def parse_cards(xml_path: str) -> List[Card]:
+    return list(expand_runs(parse_card_runs(xml_path)))
+
+
+def _resolve_include(include, xml_path: str, huge_tree: bool = False) -> list:
+    """Resolve a single top-level `<xi:include>` element.
+
+    Only the included fragment is held in memory, and it comes from the
+    shared fragment cache. Returns the `<card>` elements it expands to.
+    """
+    try:
+        nodes = xinclude.include_nodes(include, xml_path, huge_tree)
+    except Exception as e:
+        logging.warning("Failed to resolve XInclude %s in %s: %s", include.attrib.get("href"), xml_path, e)
+        return []
+    # like parse_cards(), only cards that end up as direct children count
+    return [el for el in nodes if el.tag == "card"]
+
+
+def _resolve_card_includes(card, xml_path: str, huge_tree: bool = False):
+    """Return the streamed `<card>` element with the XIncludes inside it resolved, like `parse_card_runs()`."""
+    try:
+        return xinclude.resolve_element(card, xml_path, huge_tree)
+    except Exception as e:
+        logging.warning("Failed to resolve XIncludes in card %s of %s: %s", card.attrib.get("id"), xml_path, e)
+        return card
+
+
+def current_rss() -> int:
+    """Return the resident set size of this process in bytes.
+
+    Falls back to the peak RSS where /proc is not available, and to 0
+    where neither is.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def iter_card_runs(xml_path: str, huge_tree: bool = False, max_rss: Optional[int] = None) -> Iterator[CardRun]:
+    """Stream `(card, multiplicity)` runs from `xml_path`.
+
+    Uses incremental `iterparse`; each top-level `<card>` element is
+    converted and cleared as soon as it has been read, so memory stays
+    bounded regardless of deck size. When lxml is available, top-level
+    XIncludes are resolved one at a time, and so are includes inside a
+    card once that card has been read.
+
+    `huge_tree` lifts libxml2's safety limits for multi-GB documents and
+    the files they include.
+    With `max_rss` (bytes) the process RSS is checked every
+    `RSS_CHECK_INTERVAL` elements and `MemoryLimitExceeded` is raised
+    once it goes over the ceiling.
+    """
+    try:
+        from lxml import etree as LET  # type: ignore
+    except Exception:
+        LET = None
+        events = ET.iterparse(xml_path, events=("start", "end"))
+    else:
+        events = LET.iterparse(xml_path, events=("start", "end"), huge_tree=huge_tree)
+
+    cfg = config.load_config()
+    emitted = 0
+    depth = 0
+    seen = 0
+    root = None
+    for event, elem in events:
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+        if elem.tag == "card":
+            nodes = [_resolve_card_includes(elem, xml_path, huge_tree) if LET is not None else elem]
+        elif elem.tag == XINCLUDE_TAG and LET is not None:
+            nodes = _resolve_include(elem, xml_path, huge_tree)
         else:
-            ctype = node.attrib.get("type", ctype).strip()
-            cost_str = node.attrib.get("cost", "0").strip()
-            try:
-                cost = int(cost_str)
-            except ValueError:
-                cost = 0
-            school = node.attrib.get("school", None)
-            slot = node.attrib.get("slot", None)
-            klass = node.attrib.get("class", None)
-            front_icon = node.attrib.get("front_icon", None)
-            back_icon = node.attrib.get("back_icon", None)
-            # if card-level front_icon missing, try to read it from the variant child (e.g. <biome front_icon="…"/>)
-            if not front_icon:
-                for v in ("monster", "biome", "npc", "quest", "curse", "health"):
-                    el = node.find(v)
-                    if el is not None:
-                        # prefer explicit attribute on the child element
-                        front_icon = el.attrib.get("front_icon") or config.FRONT_DECK_ICONS.get(v)
-                        deck = v
-                        # if no explicit `type` attribute was provided on the card,
-                        # use the variant name as the card type (e.g. npc, monster, biome)
-                        if 'type' not in node.attrib:
-                            ctype = v
-                        break
-
-        count_str = node.attrib.get("count", "1").strip()
-        try:
-            count = int(count_str)
-            if count < 1:
-                count = 1
-        except ValueError:
-            count = 1
+            nodes = []
+        for node in nodes:
+            card = _card_from_node(node, emitted, cfg)
+            yield card, card.count
+            emitted += card.count
+        seen += 1
+        if max_rss is not None and seen % RSS_CHECK_INTERVAL == 0:
+            rss = current_rss()
+            if rss > max_rss:
+                raise MemoryLimitExceeded(
+                    f"{xml_path}:{getattr(elem, 'sourceline', None) or '?'}: memory use {rss / 2 ** 20:.0f} MiB "
+                    f"exceeded the {max_rss / 2 ** 20:.0f} MiB limit after {emitted} cards")
+        elem.clear()
+        if LET is not None:
+            # prune comments and PIs left before it, which are never yielded
+            while elem.getprevious() is not None:
+                del root[0]
+        root.remove(elem)
 
-        if not cid:
-            cid = f"{ctype}_{len(cards)+1}"
-
-        # parse monster-specific stats if present
-        m = node.find('monster')
-        hp = None
-        atk = None
-        lootBudget = None
-        biome = None
-        if m is not None:
-            hp_str = m.attrib.get('hp')
-            atk_str = m.attrib.get('atk')
-            lb_str = m.attrib.get('lootBudget') or m.attrib.get('lootbudget')
-            biome = m.attrib.get('biome') or m.attrib.get('biome')
-            try:
-                hp = int(hp_str) if hp_str is not None else None
-            except Exception:
-                hp = None
-            try:
-                atk = int(atk_str) if atk_str is not None else None
-            except Exception:
-                atk = None
-            try:
-                lootBudget = int(lb_str) if lb_str is not None else None
-            except Exception:
-                lootBudget = None
-
-        for _ in range(count):
-            cards.append(Card(
-                id=cid,
-                type=ctype,
-                cost=cost,
-                name=name,
-                subtitle=subtitle,
-                effect=effect,
-                hp=hp,
-                atk=atk,
-                lootBudget=lootBudget,
-                biome=biome,
-                back_icon=back_icon,
-                school=school,
-                slot=slot,
-                klass=klass,
-                front_icon=front_icon,
-                deck=deck,
-                count=count,
-                tags=tags,
-            ))
-
-    return cards
+
+def iter_cards(xml_path: str) -> Iterator[Card]:
+    """Stream printed cards from `xml_path` without loading the whole document.
+
+    Cards with `count="N"` are yielded N times as the same instance.
+    """
+    return expand_runs(iter_card_runs(xml_path))
+
+
+# Streaming loaders by input file extension
+LOADERS: Dict[str, Callable[[str], Iterator[CardRun]]] = {
+    ".xml": iter_card_runs,
+    ".jsonl": iter_jsonl_card_runs,
+    ".csv": iter_csv_card_runs,
+}
+
+
+# Row readers of the tabular formats, yielding (line number, row)
+ROW_READERS: Dict[str, Callable[[str], Iterator[Tuple[int, Mapping]]]] = {
+    ".jsonl": _numbered_jsonl_rows,
+    ".csv": _numbered_csv_rows,
+}
+
+
+def iter_file_rows(path: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Stream `(line number, attributes)` of a JSONL / CSV card file.
+
+    Attributes are the normalized row as `_card_from_row()` reads it;
+    malformed lines raise `RowError`.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    reader = ROW_READERS.get(ext)
+    if reader is None:
+        raise ValueError(f"Unsupported row file type {ext!r}: {path}")
+    return ((lineno, _normalize_row(row)) for lineno, row in reader(path))
+
+
+def iter_file_card_runs(path: str) -> Iterator[CardRun]:
+    """Stream card runs from `path`, choosing the loader by file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    loader = LOADERS.get(ext)
+    if loader is None:
+        raise ValueError(f"Unsupported card file type {ext!r}: {path}")
+    return loader(path)
+
+
+def parse_file_card_runs(path: str) -> List[CardRun]:
+    """Load all card runs from `path`; XML goes through `parse_card_runs()`."""
+    if path.lower().endswith(".xml"):
+        return parse_card_runs(path)
+    return list(iter_file_card_runs(path))
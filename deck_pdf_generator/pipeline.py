@@ -0,0 +1,185 @@
+import os
+import logging
+import contextlib
+import itertools
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from .types import Card, CardRun
+from . import cache, config, deckpack, fonts, parser, render, xinclude
+from .query import CardIndex, Selection
+from .validate import validate_xml
+
+# Sheets per output PDF in huge mode: reportlab holds a document's pages in
+# memory until it is saved, so huge decks are written in parts
+HUGE_PAGES_PER_FILE = 200
+
+
+@dataclass
+class FileResult:
+    """Outcome of running the validate/parse/render pipeline on one file."""
+    xml_path: str
+    counts: Counter = field(default_factory=Counter)
+    out_pdf: Optional[str] = None
+    # files actually written: `out_pdf` itself, or its parts in huge mode
+    out_files: List[str] = field(default_factory=list)
+    cache_stats: Counter = field(default_factory=Counter)
+    error: Optional[str] = None
+
+
+def _stats() -> Counter:
+    return cache.STATS + xinclude.STATS
+
+
+def _tally(cards: Iterable[Card], counts: Counter) -> Iterator[Card]:
+    """Yield `cards` unchanged while counting them per deck into `counts`."""
+    for card in cards:
+        counts[card.deck or 'loot'] += 1
+        yield card
+
+
+def _count_runs(runs: Iterable[CardRun]) -> Counter:
+    """Count the printed cards of `runs` per deck."""
+    counts: Counter = Counter()
+    for card, n in runs:
+        counts[card.deck or 'loot'] += n
+    return counts
+
+
+def process_file(xml_path: str, outdir: str, xsd_path: Optional[str] = None, color: bool = False,
+                 zero_gaps: bool = False, cache_dir: Optional[str] = cache.DEFAULT_CACHE_DIR,
+                 selection: Optional[Selection] = None, ids: Optional[Sequence[str]] = None,
+                 huge: bool = False, max_rss: Optional[int] = None, config_path: Optional[str] = None) -> FileResult:
+    """Validate, parse and render a single deck file into `outdir`.
+
+    When `cache_dir` is None the deck is streamed from XML without using
+    the parsed-deck cache, and validation is always performed. With
+    `selection` and/or `ids` only the matching cards are rendered.
+    JSONL / CSV decks are not validated, and a compiled `.deckpack` is
+    rendered directly.
+
+    With `huge` an XML deck is always streamed with lxml's `huge_tree`,
+    bypassing the cache and XSD validation (which would load the whole
+    document), and rendered into parts of `HUGE_PAGES_PER_FILE` sheets
+    (see `render.part_path()`), so neither parsing nor rendering holds
+    the whole deck. `max_rss` (bytes) caps the process memory; exceeding
+    it raises `parser.MemoryLimitExceeded`.
+
+    `config_path` selects the icons.xml (it is made the active config, so
+    it also applies in pool workers that do not inherit the caller's).
+    """
+    if config_path:
+        config.set_config_path(config_path)
+    result = FileResult(xml_path)
+    stats_before = _stats()
+    selecting = bool(selection or ids)
+    index = None
+    table = None
+    with contextlib.ExitStack() as resources:
+        if deckpack.is_deckpack(xml_path):
+            # closed once the lazily decoded cards have been rendered
+            pack = resources.enter_context(deckpack.DeckPack(xml_path))
+            if selecting:
+                index = CardIndex(pack.runs())
+            else:
+                # cards are decoded lazily while rendering
+                result.counts = pack.histogram("deck", default="loot")
+                cards = iter(pack)
+        else:
+            is_xml = xml_path.lower().endswith(".xml")
+            huge = huge and is_xml
+            if xsd_path and os.path.exists(xsd_path) and is_xml:
+                if huge:
+                    logging.warning(f"Huge mode: skipping XSD validation of {xml_path} (use --check on smaller decks)")
+                else:
+                    validate_xml(xml_path, xsd_path, cache_dir)
+                    logging.info(f"XML {xml_path} validated against {xsd_path}")
+            if huge:
+                stream = parser.iter_card_runs(xml_path, huge_tree=True, max_rss=max_rss)
+            elif cache_dir is None:
+                stream = parser.iter_file_card_runs(xml_path)
+            else:
+                stream = None
+            if stream is None:
+                index = cache.load_card_index(xml_path, cache_dir)
+                # statistics come from the columnar table cached with the index
+                table = index.table
+            elif selecting:
+                index = CardIndex(stream)
+            else:
+                # streamed cards are counted on their way to the renderer
+                cards = _tally(parser.expand_runs(stream), result.counts)
+        if index is not None:
+            rows = index.positions(selection or [], ids) if selecting else None
+            runs = [index.runs[i] for i in rows] if selecting else index.runs
+            if table is not None:
+                result.counts = table.histogram("deck", default="loot", rows=rows)
+            else:
+                result.counts = _count_runs(runs)
+            cards = parser.expand_runs(runs)
+
+        first = next(cards, None)
+        if first is None:
+            result.cache_stats = _stats() - stats_before
+            logging.info(f"No cards found in {xml_path}, skipping")
+            return result
+
+        base = os.path.splitext(os.path.basename(xml_path))[0]
+        suffix = "_selected" if selecting else ""
+        result.out_pdf = os.path.join(outdir, f"{base}_gnarl_cards{suffix}.pdf")
+        # registers the fonts once per process, from the parsed-font cache if possible
+        fonts.load_fonts(cache_dir)
+        # layout counts of this render only, not shared with other renders in the process
+        render_stats: Counter = Counter()
+        result.out_files = render.render_pdf(itertools.chain([first], cards), result.out_pdf, color=color,
+                                             zero_gaps=zero_gaps, pages_per_file=HUGE_PAGES_PER_FILE if huge else None,
+                                             stats=render_stats)
+        # streamed decks resolve their includes while rendering
+        result.cache_stats = _stats() - stats_before + render_stats
+        logging.info(f"OK: Rendered {sum(result.counts.values())} cards to {', '.join(result.out_files)}")
+        return result
+
+
+def compile_file(xml_path: str, outdir: str, cache_dir: Optional[str] = cache.DEFAULT_CACHE_DIR) -> str:
+    """Compile a deck file into `outdir/<name>.deckpack` and return its path."""
+    if cache_dir is not None:
+        runs = cache.load_card_runs(xml_path, cache_dir)
+    else:
+        runs = parser.parse_file_card_runs(xml_path)
+    base = os.path.splitext(os.path.basename(xml_path))[0]
+    out_path = os.path.join(outdir, base + deckpack.EXTENSION)
+    n = deckpack.write_deckpack(runs, out_path)
+    logging.info(f"OK: Compiled {n} unique cards from {xml_path} to {out_path}")
+    return out_path
+
+
+def _process_file_safe(xml_path: str, **options) -> FileResult:
+    try:
+        return process_file(xml_path, **options)
+    except Exception as e:
+        logging.debug("Pipeline failed for %s:\n%s", xml_path, traceback.format_exc())
+        return FileResult(xml_path, error=f"{type(e).__name__}: {e}")
+
+
+def run_files(xml_paths: List[str], jobs: int = 1, **options) -> List[FileResult]:
+    """Run `process_file` for every path, optionally in a process pool.
+
+    Results are returned in the order of `xml_paths` regardless of which
+    worker finishes first. A failing deck is reported through
+    `FileResult.error` and does not stop the remaining ones.
+    """
+    if jobs <= 1 or len(xml_paths) <= 1:
+        return [_process_file_safe(p, **options) for p in xml_paths]
+
+    results: List[FileResult] = []
+    with ProcessPoolExecutor(max_workers=min(jobs, len(xml_paths))) as pool:
+        futures = [pool.submit(_process_file_safe, p, **options) for p in xml_paths]
+        for path, fut in zip(xml_paths, futures):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                # the worker process itself died (e.g. killed or out of memory)
+                results.append(FileResult(path, error=f"{type(e).__name__}: {e}"))
+    return results
@@ -0,0 +1,87 @@
+import bisect
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from .types import CardRun
+from .table import CardTable
+
+# Card fields with a precomputed index; "tag" indexes every entry of `tags`
+INDEXED_FIELDS = ("id", "deck", "type", "school", "biome")
+SELECT_KEYS = INDEXED_FIELDS + ("tag",)
+
+Selection = List[Tuple[str, str]]
+
+
+def parse_selection(text: str) -> Selection:
+    """Parse a selector such as "deck=monster,tag=boss" into (key, value) terms.
+
+    Terms are combined with AND. Raises ValueError on malformed terms or
+    unknown keys.
+    """
+    terms: Selection = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        key, sep, value = part.partition("=")
+        key = key.strip()
+        if not sep or not value.strip():
+            raise ValueError(f"Invalid selector term {part!r}; expected key=value")
+        if key not in SELECT_KEYS:
+            raise ValueError(f"Unknown selector key {key!r}; expected one of {', '.join(SELECT_KEYS)}")
+        terms.append((key, value.strip()))
+    return terms
+
+
+def _contains(sorted_list: List[int], value: int) -> bool:
+    i = bisect.bisect_left(sorted_list, value)
+    return i < len(sorted_list) and sorted_list[i] == value
+
+
+class CardIndex:
+    """Inverted indexes over a list of card runs.
+
+    Each index maps a field value to the ascending positions of the runs
+    having it. A lookup walks the shortest posting list of the queried
+    values and probes the others by binary search, so it never rescans
+    the deck. Cards without a deck are indexed under "loot", matching the
+    deck statistics.
+    """
+
+    def __init__(self, runs: Iterable[CardRun]) -> None:
+        self.runs: List[CardRun] = list(runs)
+        self._table: Optional[CardTable] = None
+        self.postings: Dict[str, Dict[str, List[int]]] = {key: {} for key in SELECT_KEYS}
+        for pos, (card, _) in enumerate(self.runs):
+            for key in INDEXED_FIELDS:
+                value = getattr(card, key)
+                if key == "deck" and value is None:
+                    value = "loot"
+                if value is not None:
+                    self.postings[key].setdefault(value, []).append(pos)
+            for tag in card.tags:
+                self.postings["tag"].setdefault(tag, []).append(pos)
+
+    @property
+    def table(self) -> CardTable:
+        """Columnar `CardTable` of `runs` (row i is run i), built on first use and pickled with the index."""
+        if self._table is None:
+            self._table = CardTable.from_runs(self.runs)
+        return self._table
+
+    def positions(self, terms: Selection, ids: Optional[Sequence[str]] = None) -> List[int]:
+        """Return positions of runs matching all `terms` and, if given, any of `ids`."""
+        lists: List[List[int]] = [self.postings[key].get(value, []) for key, value in terms]
+        if ids:
+            lists.append(sorted({pos for cid in ids for pos in self.postings["id"].get(cid, [])}))
+        if not lists:
+            return list(range(len(self.runs)))
+        lists.sort(key=len)
+        matched = lists[0]
+        for other in lists[1:]:
+            if not matched:
+                break
+            matched = [pos for pos in matched if _contains(other, pos)]
+        return matched
+
+    def select(self, terms: Selection, ids: Optional[Sequence[str]] = None) -> List[CardRun]:
+        """Return the runs matching the selection, in deck order."""
+        return [self.runs[pos] for pos in self.positions(terms, ids)]
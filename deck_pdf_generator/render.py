@@ -1,24 +1,67 @@
 import os
-import math
+import operator
+import itertools
 import logging
-from typing import List, Optional
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 from reportlab.lib.units import mm
 from .types import Card
 from . import config
 from . import fonts
+from . import deckpack
 
+# Card fields the front layout depends on. `id` and `tags` only appear in
+# the footer, which is drawn per card on top of the shared layout.
+FRONT_FIELDS = ("deck", "type", "school", "slot", "klass", "cost", "lootBudget", "hp", "atk",
+                "biome", "front_icon", "name", "subtitle", "effect")
+# Card fields the back depends on
+BACK_FIELDS = ("deck", "back_icon", "type", "school", "cost", "biome")
 
-def wrap_text(c: canvas.Canvas, text: str, max_width: float, font_name: str, font_size: int) -> List[str]:
-    """Wrap `text` to fit into `max_width` using canvas font metrics.
+_front_key = operator.attrgetter(*FRONT_FIELDS)
+_back_key = operator.attrgetter(*BACK_FIELDS)
+
+# Heading printed at the top of every page
+PAGE_TITLE = "Gnarl – beta cards"
+
+# Wrapped effect texts a RenderContext keeps before starting over
+WRAP_CACHE_SIZE = 4096
+
+
+def front_fingerprint(card: Card) -> tuple:
+    """Return the render-relevant content of the front of `card`; equal values draw identical fronts."""
+    return _front_key(card)
+
+
+def back_fingerprint(card: Optional[Card]) -> Optional[tuple]:
+    """Return the render-relevant content of the back of `card` (None for an empty back)."""
+    return None if card is None else _back_key(card)
+
+
+def _drawn_units(text: str, chain: Tuple[str, ...]) -> float:
+    """Return the advance width of `text` in 1/1000 em as `draw_text()` draws it with `chain`."""
+    return sum(fonts.text_units(run, font) for font, run in fonts.segment(text, chain))
+
+
+def wrap_text(c: canvas.Canvas, text: str, max_width: float, font_name: str, font_size: int,
+              word_units: Optional[Dict[str, float]] = None,
+              chain: Optional[Tuple[str, ...]] = None) -> List[str]:
+    """Wrap `text` to fit into `max_width` when drawn in `font_name` at `font_size`.
 
     Normalizes literal "\\n" sequences into real newlines and preserves
     paragraph breaks. Returns a list of output lines that will fit within
     the provided `max_width` when rendered with `font_name`/`font_size`.
+    Each word is measured once, split into font runs by `fonts.segment()`
+    like `draw_text()` splits it for the fallback `chain` (default: only
+    `font_name`), or looked up in `word_units` (see `wrap_texts()`);
+    trial line widths are sums of word and space widths.
     """
     c.setFont(font_name, font_size)
     lines: List[str] = []
+    chain = chain or (font_name,)
+    space = _drawn_units(" ", chain)
 
     # Normalize literal "\\n" sequences into real newlines, then split into paragraphs
     if text is None:
@@ -34,16 +77,18 @@ def wrap_text(c: canvas.Canvas, text: str, max_width: float, font_name: str, fon
 
         words = para.split()
         cur: List[str] = []
+        cur_units = 0.0
         for w in words:
-            trial = (" ".join(cur + [w])).strip()
-            if not trial:
-                continue
-            if c.stringWidth(trial, font_name, font_size) <= max_width:
+            units = word_units[w] if word_units is not None else _drawn_units(w, chain)
+            trial_units = cur_units + space + units if cur else units
+            if 0.001 * font_size * trial_units <= max_width:
                 cur.append(w)
+                cur_units = trial_units
             else:
                 if cur:
                     lines.append(" ".join(cur))
                     cur = [w]
+                    cur_units = units
                 else:
                     lines.append(w)
 
@@ -53,15 +98,38 @@ def wrap_text(c: canvas.Canvas, text: str, max_width: float, font_name: str, fon
     return lines
 
 
-def icon_for(card: Card) -> str:
+def wrap_texts(c: canvas.Canvas, texts: Sequence[Optional[str]], max_width: float, font_name: str,
+               font_size: int, chain: Optional[Tuple[str, ...]] = None) -> List[List[str]]:
+    """Wrap every text of `texts` like `wrap_text()`.
+
+    The distinct words of all texts are split into font runs and the runs
+    of each font are measured in one batch with `fonts.text_units_many()`,
+    which is much faster for many texts (a whole page or deck) than
+    measuring word by word.
+    """
+    chain = chain or (font_name,)
+    words = list({w for text in texts if text for w in text.replace('\\n', '\n').split()})
+    segmented = [fonts.segment(w, chain) for w in words]
+    runs_by_font: Dict[str, List[str]] = {}
+    for runs in segmented:
+        for font, run in runs:
+            runs_by_font.setdefault(font, []).append(run)
+    run_units = {font: dict(zip(runs, fonts.text_units_many(runs, font))) for font, runs in runs_by_font.items()}
+    word_units = {w: sum(run_units[font][run] for font, run in runs) for w, runs in zip(words, segmented)}
+    return [wrap_text(c, text, max_width, font_name, font_size, word_units, chain) for text in texts]
+
+
+def icon_for(card: Card, cfg: Optional[config.Config] = None) -> str:
     """Return an icon glyph for `card` using configured mappings.
 
     Checks `card.type`, then `card.school`, and falls back to a bullet.
+    `cfg` defaults to the active config.
     """
-    if card.type in config.TYPE_ICONS:
-        return config.TYPE_ICONS[card.type]
-    if card.school and card.school in config.TYPE_ICONS:
-        return config.TYPE_ICONS[card.school]
+    type_icons = (cfg or config.load_config()).type_icons
+    if card.type in type_icons:
+        return type_icons[card.type]
+    if card.school and card.school in type_icons:
+        return type_icons[card.school]
     return "•"
 
 
@@ -80,378 +148,631 @@ def draw_cut_marks(c: canvas.Canvas, x: float, y: float, w: float, h: float, siz
     c.line(x + w, y - size, x + w, y)
 
 
-def draw_card(c: canvas.Canvas, card: Card, x: float, y: float, w: float, h: float, color: bool = False) -> None:
+def draw_text(c: canvas.Canvas, x: float, y: float, text: str, chain: Tuple[str, ...], size: float,
+              align: str = "left") -> None:
+    """Draw `text` at (x, y), taking each glyph from the first font of `chain` that has it.
+
+    `align` is "left", "right" or "centre", like `drawString()`,
+    `drawRightString()` and `drawCentredString()`. Text the first font
+    covers is drawn exactly as those would draw it; the font runs of
+    other text come from `fonts.segment()`, which is memoized.
+    """
+    runs = fonts.segment(text, chain)
+    if len(runs) == 1:
+        c.setFont(runs[0][0], size)
+        if align == "right":
+            c.drawRightString(x, y, text)
+        elif align == "centre":
+            c.drawCentredString(x, y, text)
+        else:
+            c.drawString(x, y, text)
+        return
+    widths = [fonts.measure(run, font, size) for font, run in runs]
+    if align == "right":
+        x -= sum(widths)
+    elif align == "centre":
+        x -= sum(widths) / 2
+    for (font, run), width in zip(runs, widths):
+        c.setFont(font, size)
+        c.drawString(x, y, run)
+        x += width
+
+
+@dataclass(frozen=True)
+class RenderContext:
+    """Fonts, icon config, layout sizes and caches a render works with.
+
+    The context is immutable and holds no per-render state, so it can be
+    shared by renders running in several threads, and renders with
+    different contexts can run side by side in one process. Build one
+    with `RenderContext.create()`; `dataclasses.replace()` derives
+    variants that share the caches.
+    """
+    fonts: fonts.FontSet
+    cfg: config.Config
+    layout: config.Layout = field(default_factory=config.Layout)
+    # wrapped effect lines keyed by (text, width, font, size)
+    wrap_cache: Dict[tuple, Tuple[str, ...]] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def create(cls, cfg: Optional[config.Config] = None, layout: Optional[config.Layout] = None) -> "RenderContext":
+        """Register the fonts and build a context for `cfg` (default: the active config)."""
+        return cls(fonts.load_fonts(), cfg or config.load_config(), layout or config.Layout())
+
+    def wrap(self, c: canvas.Canvas, text: str, max_width: float, font_name: str, font_size: int) -> Tuple[str, ...]:
+        """Return `wrap_text()` lines, computing each distinct text once per context."""
+        key = (text, max_width, font_name, font_size)
+        lines = self.wrap_cache.get(key)
+        if lines is None:
+            if len(self.wrap_cache) >= WRAP_CACHE_SIZE:
+                self.wrap_cache.clear()
+            lines = self.wrap_cache[key] = tuple(wrap_text(c, text, max_width, font_name, font_size,
+                                                           chain=self.fonts.chain(font_name)))
+        return lines
+
+    def wrap_many(self, c: canvas.Canvas, texts: Iterable[str], max_width: float, font_name: str, font_size: int) -> None:
+        """Wrap the `texts` not cached yet in one `wrap_texts()` batch, so later `wrap()` calls hit the cache."""
+        todo = list({text for text in texts if (text, max_width, font_name, font_size) not in self.wrap_cache})
+        if not todo:
+            return
+        if len(self.wrap_cache) + len(todo) > WRAP_CACHE_SIZE:
+            self.wrap_cache.clear()
+        for text, lines in zip(todo, wrap_texts(c, todo, max_width, font_name, font_size,
+                                                self.fonts.chain(font_name))):
+            self.wrap_cache[(text, max_width, font_name, font_size)] = tuple(lines)
+
+
+_default_context: Optional[RenderContext] = None
+
+
+def default_context() -> RenderContext:
+    """Return the context used when none is passed: the active config with the default layout."""
+    global _default_context
+    cfg = config.load_config()
+    ctx = _default_context
+    if ctx is None:
+        ctx = _default_context = RenderContext.create(cfg)
+    elif ctx.cfg is not cfg:
+        ctx = _default_context = replace(ctx, cfg=cfg)
+    return ctx
+
+
+@dataclass(frozen=True, slots=True)
+class RenderRecord:
+    """Display values of one card, resolved once by `resolve_card()`.
+
+    The draw functions only place these values; they do no config
+    lookups, string building or file checks of their own. `card` is None
+    for the empty back drawn in unused grid slots.
+    """
+    card: Optional[Card]
+    header_color: Any
+    meta: str
+    cost_text: Optional[str]
+    left_icon: str
+    # large front icon: glyph is None when the card has no front icon
+    front_glyph: Optional[str]
+    front_image: Optional[str]
+    small_image: Optional[str]
+    title: str
+    subtitle: str
+    effect: str
+    stats: Optional[str]
+    footer: str
+    back_color: Any
+    back_glyph: str
+    back_image: Optional[str]
+    back_cost: Optional[str]
+    back_biome_glyph: Optional[str]
+    back_label: str
+
+
+def _icon_image(name: Optional[str]) -> Optional[str]:
+    path = os.path.join("icons", f"{name}.png")
+    return path if os.path.exists(path) else None
+
+
+def _resolve_back(card: Optional[Card], cfg: config.Config) -> Tuple[str, Optional[str]]:
+    """Return the back glyph and back image of `card`."""
+    icon_text = cfg.back_deck_icons.get("loot", cfg.type_icons.get("coin", "◈"))
+    icon_img_path = None
+    if card is not None:
+        # prefer explicit back_icon on the card (from loot/back_icon attribute)
+        if card.back_icon:
+            # use only the first character/glyph for back rendering
+            icon_text = card.back_icon
+            icon_img_path = _icon_image(card.back_icon)
+        else:
+            # fall back to deck/type defaults
+            if card.deck and card.deck in cfg.back_deck_icons:
+                icon_text = cfg.back_deck_icons.get(card.deck, icon_text)
+            elif card.type in cfg.loot_front_defaults:
+                icon_text = cfg.back_deck_icons.get("loot", icon_text)
+            else:
+                icon_text = icon_for(card, cfg)
+            icon_img_path = _icon_image(card.type)
+            if icon_img_path is None:
+                logging.debug("No specific back image found for card type '%s'", card.type)
+    return (icon_text or '')[:1], icon_img_path
+
+
+def resolve_card(card: Optional[Card], cfg: Optional[config.Config] = None) -> RenderRecord:
+    """Compute everything `draw_card()` and `draw_back()` display for `card`.
+
+    Icons and colors come from `cfg`, by default the active config.
+    """
+    cfg = cfg or config.load_config()
+    back_glyph, back_image = _resolve_back(card, cfg)
+    deck_name = (card.deck if card is not None else None) or "loot"
+    back_color = cfg.deck_colors.get(deck_name, colors.lightblue)
+    back_label = f"Gnarl — {deck_name}"
+    if card is None:
+        return RenderRecord(None, colors.whitesmoke, "", None, "", None, None, None, "", "", "", None, "",
+                            back_color, back_glyph, back_image, None, None, back_label)
+
+    ic = icon_for(card, cfg)
+    meta = " • ".join(p for p in (card.school, card.type, card.slot, card.klass) if p)
+    coin_sym = cfg.type_icons.get("coin", "◈")
+    is_monster = card.type == 'monster'
+
+    # draw cost (or monster lootBudget) only when non-zero
+    display_cost = card.lootBudget if is_monster and card.lootBudget is not None else card.cost
+    cost_text = f"{coin_sym} {display_cost}" if display_cost else None
+
+    # left/top icon text: for monsters prefer biome-specific icon
+    left_icon = None
+    if is_monster and card.biome:
+        left_icon = cfg.front_biome_icons.get(card.biome)
+    if not left_icon:
+        left_icon = cfg.type_icons.get(card.type) or ic
+
+    front_glyph = None
+    front_image = None
+    if card.front_icon:
+        front_glyph = cfg.type_icons.get(card.front_icon) or card.front_icon
+        front_image = _icon_image(card.front_icon)
+        if front_image is None:
+            logging.info("Icon image not found for front icon '%s' (expected %s); falling back to glyph",
+                         front_glyph, os.path.join("icons", f"{card.front_icon}.png"))
+
+    stats = None
+    if is_monster:
+        stat_parts = []
+        if card.hp is not None:
+            stat_parts.append(f"❤️ {card.hp}")
+        if card.atk is not None:
+            stat_parts.append(f"⚔ {card.atk}")
+        if card.lootBudget is not None:
+            stat_parts.append(f"{coin_sym} {card.lootBudget}")
+        stats = "   ".join(stat_parts) or None
+
+    footer = f"{card.id}"
+    tags = ", ".join(card.tags or [])
+    if tags:
+        footer += f" | {tags}"
+
+    biome_icon = cfg.front_biome_icons.get(card.biome) if is_monster and card.biome else None
+
+    return RenderRecord(
+        card=card,
+        header_color=cfg.deck_colors.get(deck_name, colors.whitesmoke),
+        meta=meta[:80],
+        cost_text=cost_text,
+        left_icon=left_icon,
+        front_glyph=front_glyph,
+        front_image=front_image,
+        small_image=_icon_image(card.type),
+        title=(card.name or '')[:40],
+        subtitle=(card.subtitle or '')[:55],
+        effect=card.effect,
+        stats=stats,
+        footer=footer[:95],
+        back_color=back_color,
+        back_glyph=back_glyph,
+        back_image=back_image,
+        back_cost=str(card.cost) if card.cost else None,
+        back_biome_glyph=biome_icon[:1] if biome_icon else None,
+        back_label=back_label,
+    )
+
+
+def _record(card: Union[Card, RenderRecord, None], ctx: RenderContext) -> RenderRecord:
+    return card if isinstance(card, RenderRecord) else resolve_card(card, ctx.cfg)
+
+
+def _card_id(rec: RenderRecord) -> str:
+    return getattr(rec.card, 'id', '<unknown>')
+
+
+def draw_card(c: canvas.Canvas, card: Union[Card, RenderRecord], x: float, y: float, w: float, h: float,
+              color: bool = False, ctx: Optional[RenderContext] = None) -> None:
     """Draw the front side of a single `card` onto the canvas `c`.
 
     Parameters:
     - `c`: reportlab canvas to draw onto.
-    - `card`: Card data structure with fields used for rendering.
+    - `card`: Card data structure (or its resolved `RenderRecord`).
     - `x`, `y`: lower-left coordinates of the card box.
     - `w`, `h`: width and height of the card box.
     - `color`: when True, use deck color fill for the header.
+    - `ctx`: fonts, config and sizes to use; defaults to `default_context()`.
     """
+    ctx = ctx or default_context()
+    rec = _record(card, ctx)
+    draw_card_face(c, rec, x, y, w, h, color=color, ctx=ctx)
+    draw_card_footer(c, rec, x, y, ctx=ctx)
+
+
+def _draw_small_icon(c: canvas.Canvas, rec: RenderRecord, ix: float, header_y_top: float, ctx: RenderContext) -> None:
+    """Draw the small top-left header icon: the type image, or the left icon glyph."""
+    lay = ctx.layout
+    if rec.small_image:
+        try:
+            c.drawImage(rec.small_image, ix, header_y_top - lay.icon_size, width=lay.icon_size, height=lay.icon_size, mask='auto')
+            return
+        except Exception:
+            logging.warning("Failed to draw small icon image %s for card %s; using glyph '%s'", rec.small_image, _card_id(rec), rec.left_icon)
+    else:
+        logging.debug("Small icon image not found for card %s; using glyph '%s'", _card_id(rec), rec.left_icon)
+    draw_text(c, ix, header_y_top - 12, rec.left_icon, ctx.fonts.chain(ctx.fonts.icon), 12)
+
+
+def draw_card_face(c: canvas.Canvas, rec: RenderRecord, x: float, y: float, w: float, h: float, color: bool = False,
+                   ctx: Optional[RenderContext] = None) -> None:
+    """Draw the front of a resolved card without the footer.
+
+    Everything drawn here depends only on `FRONT_FIELDS`, so cards with the
+    same `front_fingerprint()` can share it.
+    """
+    ctx = ctx or default_context()
+    lay = ctx.layout
     c.setLineWidth(1)
     c.rect(x, y, w, h, stroke=1, fill=0)
 
     if color:
-        deck_name = card.deck or "loot"
-        header_color = config.DECK_COLORS.get(deck_name, colors.whitesmoke)
+        c.setFillColor(rec.header_color)
+        c.rect(x + 0.5, y + h - lay.header_h - 0.5, w - 1, lay.header_h, stroke=0, fill=1)
         # always use black text for colored cards
-        text_color = colors.black
-        c.setFillColor(header_color)
-        c.rect(x + 0.5, y + h - config.HEADER_H - 0.5, w - 1, config.HEADER_H, stroke=0, fill=1)
-        c.setFillColor(text_color)
+        c.setFillColor(colors.black)
 
     c.setLineWidth(0.4)
     draw_cut_marks(c, x, y, w, h)
 
-    ix = x + config.PADDING
-    iy = y + config.PADDING
-    iw = w - 2 * config.PADDING
-    ih = h - 2 * config.PADDING
-
-    header_y_top = y + h - config.PADDING
-    header_y_bottom = y + h - config.PADDING - config.HEADER_H
-
-    ic = icon_for(card)
-    meta_parts = []
-    if card.school:
-        meta_parts.append(card.school)
-    if card.type:
-        meta_parts.append(card.type)
-    if card.slot:
-        meta_parts.append(card.slot)
-    if card.klass:
-        meta_parts.append(card.klass)
-    meta = " • ".join(meta_parts)
+    ix = x + lay.padding
+    iw = w - 2 * lay.padding
 
-    # draw cost (or monster lootBudget) only when non-zero
-    display_cost = None
-    if getattr(card, 'type', None) == 'monster' and getattr(card, 'lootBudget', None) is not None:
-        display_cost = getattr(card, 'lootBudget', 0)
-    else:
-        display_cost = getattr(card, 'cost', 0)
+    header_y_top = y + h - lay.padding
+    header_y_bottom = y + h - lay.padding - lay.header_h
 
-    coin_sym = config.TYPE_ICONS.get("coin", "◈")
-    if display_cost:
-        c.setFont(fonts.FONT_BOLD, config.COST_SIZE)
-        cost_text = f"{coin_sym} {display_cost}"
-        cost_y = header_y_top - (config.COST_SIZE / 2) - 2
-        c.drawRightString(x + w - config.PADDING, cost_y, cost_text)
+    if rec.cost_text:
+        cost_y = header_y_top - (lay.cost_size / 2) - 2
+        draw_text(c, x + w - lay.padding, cost_y, rec.cost_text, ctx.fonts.chain(ctx.fonts.bold), lay.cost_size, "right")
 
     cx = x + w / 2
 
-    # determine left/top icon text: for monsters prefer biome-specific icon
-    left_icon_text = None
-    if getattr(card, 'type', None) == 'monster' and getattr(card, 'biome', None):
-        left_icon_text = config.FRONT_BIOME_ICONS.get(card.biome)
-    if not left_icon_text:
-        left_icon_text = config.TYPE_ICONS.get(card.type) or ic
-
-    if card.front_icon:
-        icon_img_path = os.path.join("icons", f"{card.front_icon}.png")
-        icon_text = config.TYPE_ICONS.get(card.front_icon) or card.front_icon or ic
+    if rec.front_glyph is not None:
         large_size = min(w * 0.5, h * 0.35)
         content_top = header_y_bottom - 4
-        content_bottom = y + config.PADDING + config.FOOTER_H
+        content_bottom = y + lay.padding + lay.footer_h
         icon_center_y = content_bottom + (content_top - content_bottom) * 0.66
         try:
-            if os.path.exists(icon_img_path):
-                c.drawImage(icon_img_path, cx - large_size / 2, icon_center_y - large_size / 2,
+            if rec.front_image:
+                c.drawImage(rec.front_image, cx - large_size / 2, icon_center_y - large_size / 2,
                             width=large_size, height=large_size, mask='auto')
             else:
-                logging.info("Icon image not found for front icon '%s' (expected %s); falling back to glyph", icon_text, icon_img_path)
-                icon_font_name = fonts.ICON_FONT if fonts.ICON_FONT_PATH else fonts.FONT_REG
-                c.setFont(icon_font_name, int(min(48, large_size / mm * 4)))
-                c.drawCentredString(cx, icon_center_y, icon_text)
+                draw_text(c, cx, icon_center_y, rec.front_glyph, ctx.fonts.chain(ctx.fonts.icon),
+                          int(min(48, large_size / mm * 4)), "centre")
         except Exception:
-            logging.warning("Failed to draw front icon image '%s' or glyph '%s' for card %s", icon_img_path, icon_text, getattr(card, 'id', '<unknown>'))
-            icon_font_name = fonts.ICON_FONT if fonts.ICON_FONT_PATH else fonts.FONT_REG
-            c.setFont(icon_font_name, 28)
+            logging.warning("Failed to draw front icon image '%s' or glyph '%s' for card %s", rec.front_image, rec.front_glyph, _card_id(rec))
             try:
-                c.drawCentredString(cx, icon_center_y + 6, icon_text)
+                draw_text(c, cx, icon_center_y + 6, rec.front_glyph, ctx.fonts.chain(ctx.fonts.icon), 28, "centre")
             except Exception:
-                logging.error("Failed to fallback-draw front glyph '%s' for card %s", icon_text, getattr(card, 'id', '<unknown>'))
+                logging.error("Failed to fallback-draw front glyph '%s' for card %s", rec.front_glyph, _card_id(rec))
 
         # small header icon (biome/type)
-        small_icon_path = os.path.join("icons", f"{card.type}.png")
-        if os.path.exists(small_icon_path):
-            try:
-                c.drawImage(small_icon_path, ix, header_y_top - config.ICON_SIZE, width=config.ICON_SIZE, height=config.ICON_SIZE, mask='auto')
-            except Exception:
-                logging.warning("Failed to draw small icon image %s for card %s; using glyph '%s'", small_icon_path, getattr(card, 'id', '<unknown>'), left_icon_text)
-                icon_font_name = fonts.ICON_FONT if fonts.ICON_FONT_PATH else fonts.FONT_REG
-                c.setFont(icon_font_name, 12)
-                c.drawString(ix, header_y_top - 12, left_icon_text)
-        else:
-            logging.debug("Small icon image not found: %s; using glyph '%s'", small_icon_path, left_icon_text)
-            icon_font_name = fonts.ICON_FONT if fonts.ICON_FONT_PATH else fonts.FONT_REG
-            c.setFont(icon_font_name, 12)
-            c.drawString(ix, header_y_top - 12, left_icon_text)
-
+        _draw_small_icon(c, rec, ix, header_y_top, ctx)
         body_top = icon_center_y - (large_size / 2) - 4
     else:
         # no large front icon: draw small top-left icon and set body area under header
-        small_icon_path = os.path.join("icons", f"{card.type}.png")
-        if os.path.exists(small_icon_path):
-            try:
-                c.drawImage(small_icon_path, ix, header_y_top - config.ICON_SIZE, width=config.ICON_SIZE, height=config.ICON_SIZE, mask='auto')
-            except Exception:
-                logging.warning("Failed to draw small icon image %s for card %s; using glyph '%s'", small_icon_path, getattr(card, 'id', '<unknown>'), left_icon_text)
-                icon_font_name = fonts.ICON_FONT if fonts.ICON_FONT_PATH else fonts.FONT_REG
-                c.setFont(icon_font_name, 12)
-                c.drawString(ix, header_y_top - 12, left_icon_text)
-        else:
-            logging.debug("Small icon image not found: %s; using glyph '%s'", small_icon_path, left_icon_text)
-            icon_font_name = fonts.ICON_FONT if fonts.ICON_FONT_PATH else fonts.FONT_REG
-            c.setFont(icon_font_name, 12)
-            c.drawString(ix, header_y_top - 12, left_icon_text)
-
+        _draw_small_icon(c, rec, ix, header_y_top, ctx)
         body_top = header_y_bottom - 4
 
     # Title and subtitle next to the small icon
-    title_x = ix + config.ICON_SIZE / 2 + 1
-    c.setFont(fonts.FONT_BOLD, config.TITLE_SIZE)
+    title_x = ix + lay.icon_size / 2 + 1
     title_y = header_y_top - 12
-    c.drawString(title_x, title_y, (card.name or '')[:40])
-
-    c.setFont(fonts.FONT_REG, config.SUBTITLE_SIZE)
-    c.drawString(title_x, title_y - 10, (card.subtitle or '')[:55])
-
-    c.setFont(fonts.FONT_REG, config.META_SIZE)
-    c.drawString(ix, header_y_bottom + 2, meta[:80])
+    regular = ctx.fonts.chain(ctx.fonts.regular)
+    draw_text(c, title_x, title_y, rec.title, ctx.fonts.chain(ctx.fonts.bold), lay.title_size)
+    draw_text(c, title_x, title_y - 10, rec.subtitle, regular, lay.subtitle_size)
+    draw_text(c, ix, header_y_bottom + 2, rec.meta, regular, lay.meta_size)
 
-    body_bottom = y + config.PADDING + config.FOOTER_H
+    body_bottom = y + lay.padding + lay.footer_h
     body_h = body_top - body_bottom
-    max_lines = int(body_h / (config.BODY_SIZE + 2)) if body_h > 0 else 1
-    line_y = body_top - config.BODY_SIZE
+    max_lines = int(body_h / (lay.body_size + 2)) if body_h > 0 else 1
+    line_y = body_top - lay.body_size
 
-    c.setFont(fonts.FONT_REG, config.BODY_SIZE)
-    lines = wrap_text(c, card.effect, iw, fonts.FONT_REG, config.BODY_SIZE)[:max_lines]
+    lines = ctx.wrap(c, rec.effect, iw, ctx.fonts.regular, lay.body_size)[:max_lines]
     for ln in lines:
-        c.drawString(ix, line_y, ln)
-        line_y -= (config.BODY_SIZE + 2)
+        draw_text(c, ix, line_y, ln, regular, lay.body_size)
+        line_y -= (lay.body_size + 2)
 
     # Draw monster stats row just above footer area
-    body_bottom = y + config.PADDING + config.FOOTER_H  + (config.STAT_SIZE + 4)
-    stats_y = body_bottom - (config.STAT_SIZE + 2)
-    if getattr(card, 'type', None) == 'monster':
-        stat_parts = []
-        if getattr(card, 'hp', None) is not None:
-            stat_parts.append(f"❤️ {card.hp}")
-        if getattr(card, 'atk', None) is not None:
-            stat_parts.append(f"⚔ {card.atk}")
-        lb = getattr(card, 'lootBudget', None)
-        if lb is not None:
-            coin_sym = config.TYPE_ICONS.get("coin", "◈")
-            stat_parts.append(f"{coin_sym} {lb}")
-        if stat_parts:
-            c.setFont(fonts.FONT_REG, config.STAT_SIZE)
-            stats_text = "   ".join(stat_parts)
-            c.drawString(ix, stats_y, stats_text)
-
-    footer_y = y + config.PADDING + 2
-    c.setFont(fonts.FONT_REG, config.META_SIZE)
-    tags = ", ".join(card.tags or [])
-    footer = f"{card.id}"
-    if tags:
-        footer += f" | {tags}"
-    c.drawString(ix, footer_y, footer[:95])
+    if rec.stats:
+        body_bottom = y + lay.padding + lay.footer_h + (lay.stat_size + 4)
+        stats_y = body_bottom - (lay.stat_size + 2)
+        draw_text(c, ix, stats_y, rec.stats, regular, lay.stat_size)
+
+
+def draw_card_footer(c: canvas.Canvas, rec: RenderRecord, x: float, y: float, ctx: Optional[RenderContext] = None) -> None:
+    """Draw the id / tags footer line of the front of a resolved card."""
+    ctx = ctx or default_context()
+    lay = ctx.layout
+    draw_text(c, x + lay.padding, y + lay.padding + 2, rec.footer, ctx.fonts.chain(ctx.fonts.regular), lay.meta_size)
 
 
-def draw_back(c: canvas.Canvas, card: Optional[Card], x: float, y: float, w: float, h: float, color: bool = False) -> None:
+def draw_back(c: canvas.Canvas, card: Union[Card, RenderRecord, None], x: float, y: float, w: float, h: float,
+              color: bool = False, ctx: Optional[RenderContext] = None) -> None:
     """Draw the back side (reverse) of a card or an empty back.
 
     If `card` is None a generic back is drawn. Parameters mirror
-    `draw_card` (canvas, position/size, color flag).
+    `draw_card` (canvas, position/size, color flag, context).
     """
+    ctx = ctx or default_context()
+    lay = ctx.layout
+    rec = _record(card, ctx)
     c.setLineWidth(1)
     c.rect(x, y, w, h, stroke=1, fill=0)
 
     cx = x + w / 2
     cy = y + h / 2
 
-    icon_text = config.BACK_DECK_ICONS.get("loot", config.TYPE_ICONS.get("coin", "◈"))
-    icon_img_path = None
-    deck_name = (card.deck if card is not None else None) or "loot"
-    if card is not None:
-        # prefer explicit back_icon on the card (from loot/back_icon attribute)
-        back_icon_attr = getattr(card, 'back_icon', None)
-        back_icon_provided = False
-        if back_icon_attr:
-            back_icon_provided = True
-            icon_text = back_icon_attr
-            # use only the first character/glyph for back rendering
-            if icon_text:
-                icon_text = icon_text[0]
-            back_img = os.path.join("icons", f"{back_icon_attr}.png")
-            if os.path.exists(back_img):
-                icon_img_path = back_img
-
-        # if no explicit back icon image was found, fall back to deck/type defaults
-        if not icon_img_path and not back_icon_provided:
-            if card.deck and card.deck in config.BACK_DECK_ICONS:
-                icon_text = config.BACK_DECK_ICONS.get(card.deck, icon_text)
-                if icon_text:
-                    icon_text = icon_text[0]
-            else:
-                if card.type in config.LOOT_FRONT_DEFAULTS:
-                    icon_text = config.BACK_DECK_ICONS.get("loot", icon_text)
-                    if icon_text:
-                        icon_text = icon_text[0]
-                else:
-                    icon_text = icon_for(card)
-                    if icon_text:
-                        icon_text = icon_text[0]
-            potential = os.path.join("icons", f"{card.type}.png")
-            if os.path.exists(potential):
-                icon_img_path = potential
-            else:
-                logging.debug("No specific back image found for card type '%s' at %s", card.type, potential)
     # color fill should be drawn before the icon so it doesn't cover it
     if color:
-        back_color = config.DECK_COLORS.get(deck_name, colors.lightblue)
-        # always use black text for colored cards
-        text_color = colors.black
-        c.setFillColor(back_color)
+        c.setFillColor(rec.back_color)
         c.rect(x + 1, y + 1, w - 2, h - 2, stroke=0, fill=1)
-        c.setFillColor(text_color)
+        # always use black text for colored cards
+        c.setFillColor(colors.black)
 
-    if icon_img_path:
+    img_h = lay.icon_size * 4
+    if rec.back_image:
         try:
-            img_w = config.ICON_SIZE * 4
-            img_h = config.ICON_SIZE * 4
-            c.drawImage(icon_img_path, cx - img_w / 2, cy - 15 * mm, width=img_w, height=img_h, mask='auto')
+            img_w = lay.icon_size * 4
+            c.drawImage(rec.back_image, cx - img_w / 2, cy - 15 * mm, width=img_w, height=img_h, mask='auto')
         except Exception:
-            logging.warning("Failed to draw back image %s for card %s; falling back to glyph '%s'", icon_img_path, getattr(card, 'id', '<unknown>'), icon_text)
-            icon_font_name = fonts.ICON_FONT if fonts.ICON_FONT_PATH else fonts.FONT_REG
+            logging.warning("Failed to draw back image %s for card %s; falling back to glyph '%s'", rec.back_image, _card_id(rec), rec.back_glyph)
             # font size in points ~ image height
             font_size = int(img_h)
-            c.setFont(icon_font_name, font_size)
             try:
-                c.drawCentredString(cx, cy - 15 * mm + int(img_h / 4), (icon_text or '')[:1])
+                draw_text(c, cx, cy - 15 * mm + int(img_h / 4), rec.back_glyph, ctx.fonts.chain(ctx.fonts.icon),
+                          font_size, "centre")
             except Exception:
-                logging.error("Failed to draw back glyph '%s' for card %s", icon_text, getattr(card, 'id', '<unknown>'))
+                logging.error("Failed to draw back glyph '%s' for card %s", rec.back_glyph, _card_id(rec))
     else:
-        logging.debug("No back image available; using glyph '%s' for card %s", icon_text, getattr(card, 'id', '<unknown>'))
-        icon_font_name = fonts.ICON_FONT if fonts.ICON_FONT_PATH else fonts.FONT_REG
+        logging.debug("No back image available; using glyph '%s' for card %s", rec.back_glyph, _card_id(rec))
         # draw larger emoji when no image is available
-        font_size = int(config.ICON_SIZE * 4)
-        c.setFont(icon_font_name, font_size)
-        c.drawCentredString(cx, cy - 15 * mm + int((config.ICON_SIZE * 4) / 4), (icon_text or '')[:1])
+        draw_text(c, cx, cy - 15 * mm + int(img_h / 4), rec.back_glyph, ctx.fonts.chain(ctx.fonts.icon),
+                  int(img_h), "centre")
 
+    back_cost_size = int(lay.cost_size * 1.8)
+    back_y = cy - (back_cost_size / 2) - 14 * mm
     # draw back cost only when card present and cost > 0
-    if card is not None and getattr(card, 'cost', 0):
-        back_cost_size = int(config.COST_SIZE * 1.8)
-        c.setFont(fonts.FONT_BOLD, back_cost_size)
-        cost_str = str(card.cost)
-        c.drawCentredString(cx, cy - (back_cost_size / 2) - 14 * mm, cost_str)
-    
-    # pokud je karta monster.
-    if card is not None and getattr(card, 'type', None) == 'monster':
-        # If this is a monster with a biome-specific icon, draw the biome icon
-        # in the middle of the back card under the big icon
-        back_cost_size = int(config.COST_SIZE * 1.8)
-        c.setFont(fonts.FONT_BOLD, back_cost_size)
-        biome_icon = None
-        if getattr(card, 'biome', None):
-            biome_icon = config.FRONT_BIOME_ICONS.get(card.biome)
-
-        icon_font_name = fonts.ICON_FONT if fonts.ICON_FONT_PATH else fonts.FONT_REG
-        back_y = cy - (back_cost_size / 2) - 14 * mm
-        if biome_icon:
-            # draw icon slightly left of center (use only the first character)
-            biome_glyph = (biome_icon or '')[:1]
-            c.setFont(icon_font_name, back_cost_size)
-            c.drawCentredString(cx, back_y, biome_glyph)
-
-    c.setFont(fonts.FONT_BOLD, config.META_SIZE)
+    if rec.back_cost:
+        draw_text(c, cx, back_y, rec.back_cost, ctx.fonts.chain(ctx.fonts.bold), back_cost_size, "centre")
+
+    # monsters with a biome-specific icon show it in the middle of the back under the big icon
+    if rec.back_biome_glyph:
+        draw_text(c, cx, back_y, rec.back_biome_glyph, ctx.fonts.chain(ctx.fonts.icon), back_cost_size, "centre")
+
     # include deck type next to the "Gnarl" label on the back
-    deck_label = (card.deck if card is not None else None) or "loot"
-    label = f"Gnarl — {deck_label}"
-    c.drawCentredString(cx, y + config.PADDING + 2, label)
+    draw_text(c, cx, y + lay.padding + 2, rec.back_label, ctx.fonts.chain(ctx.fonts.bold), lay.meta_size, "centre")
 
 
-def render_pdf(cards: List[Card], out_path: str, color: bool = False, zero_gaps: bool = False) -> None:
-    """Render `cards` into a multi-page PDF saved to `out_path`.
+_NO_CARD = object()
 
-    Layout is determined by configuration in `config`. When `color` is
-    True, card backs and headers are drawn using deck colors.
+
+class _FormCache:
+    """Lay out every distinct card face once and place it wherever it appears.
+
+    Cards are passed as `RenderRecord`s. Each layout is captured as a PDF
+    form XObject keyed by the card's content fingerprint, so identical
+    cards under different ids (e.g. from different included files) share
+    one form. Consecutive copies of the same record skip even the
+    fingerprint. `overlay`, if given, draws the per-card parts on top.
+    Forms are clipped to `page_size` around the card origin only, so that
+    they show everything drawing on the page directly would.
+    """
+
+    def __init__(self, c: canvas.Canvas, prefix: str, draw, key, ctx: RenderContext, overlay=None,
+                 color: bool = False, page_size: Tuple[float, float] = config.PAGE_SIZE) -> None:
+        self.c = c
+        self.page_size = page_size
+        self.ctx = ctx
+        self.prefix = prefix
+        self.draw = draw
+        self.key = key
+        self.overlay = overlay
+        self.color = color
+        self.forms = 0
+        self.placed = 0
+        # distinct cards whose layout was already drawn for another card
+        self.duplicates = 0
+        self._names = {}
+        self._card = _NO_CARD
+        self._name = None
+
+    def place(self, card: RenderRecord, x: float, y: float, w: float, h: float) -> None:
+        c = self.c
+        if card is not self._card:
+            key = self.key(card.card)
+            name = self._names.get(key)
+            if name is None:
+                self.forms += 1
+                name = self._names[key] = f"{self.prefix}{self.forms}"
+                # cut marks and overflowing titles reach past the card box;
+                # the bbox covers the page wherever the card is placed on it
+                pw, ph = self.page_size
+                c.beginForm(name, -pw, -ph, pw, ph)
+                self.draw(c, card, 0, 0, w, h, color=self.color, ctx=self.ctx)
+                c.endForm()
+            else:
+                self.duplicates += 1
+            self._card = card
+            self._name = name
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(self._name)
+        c.restoreState()
+        if self.overlay is not None:
+            self.overlay(c, card, x, y, ctx=self.ctx)
+        self.placed += 1
+
+
+def resolve_cards(cards: Iterable[Card], cfg: Optional[config.Config] = None) -> Iterator[RenderRecord]:
+    """Yield the `RenderRecord` of each card, resolving consecutive copies of an instance once."""
+    cfg = cfg or config.load_config()
+    last = _NO_CARD
+    rec = None
+    for card in cards:
+        if card is not last:
+            rec = resolve_card(card, cfg)
+            last = card
+        yield rec
+
+
+def part_path(out_path: str, part: int) -> str:
+    """Return the path of the `part`-th (1-based) file of a render split by `pages_per_file`."""
+    root, ext = os.path.splitext(out_path)
+    return f"{root}_part{part:03d}{ext}"
+
+
+def _save_part(c: canvas.Canvas, fronts: "_FormCache", backs: "_FormCache", counts: Counter) -> None:
+    c.save()
+    counts.update(cards=fronts.placed, front_layouts=fronts.forms, back_layouts=backs.forms,
+                  front_duplicates=fronts.duplicates, back_duplicates=backs.duplicates, back_slots=backs.placed)
+
+
+def render_pdf(cards: Union[Iterable[Card], str], out_path: str, color: bool = False, zero_gaps: bool = False,
+               ctx: Optional[RenderContext] = None, pages_per_file: Optional[int] = None,
+               stats: Optional[Counter] = None) -> List[str]:
+    """Render `cards` into a multi-page PDF saved to `out_path` and return the paths written.
+
+    `cards` may be any iterable (e.g. `parser.iter_cards()`) or the path
+    of a compiled `.deckpack`; it is consumed one page at a time. Every distinct front and back (by
+    `front_fingerprint()` / `back_fingerprint()`) is laid out once and placed as a reusable form; the
+    work saved is logged and, if given, added to the caller's `stats` counter ("cards",
+    "front_layouts", "front_duplicates", ...). Fonts, icons and sizes come from `ctx`
+    (default: `default_context()`), so renders with different contexts can run
+    concurrently. When `color` is True, card backs and headers are drawn using
+    deck colors.
+
+    reportlab keeps every page of a document in memory until it is saved.
+    With `pages_per_file` the output is therefore split into files of at
+    most that many sheets (a front and a back page each), named by
+    `part_path()`; each is saved and released before the next one starts,
+    so memory use does not grow with the deck.
     """
+    if deckpack.is_deckpack(cards):
+        with deckpack.DeckPack(cards) as pack:
+            return render_pdf(pack, out_path, color=color, zero_gaps=zero_gaps, ctx=ctx,
+                              pages_per_file=pages_per_file, stats=stats)
+    ctx = ctx or default_context()
+    lay = ctx.layout
+
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    c = canvas.Canvas(out_path, pagesize=config.PAGE_SIZE)
-    fonts.ensure_fonts()
 
-    page_w, page_h = config.PAGE_SIZE
+    page_w, page_h = lay.page_size
     use_color = bool(color)
 
-    gap_x = 0 if zero_gaps else config.GAP_X
-    gap_y = 0 if zero_gaps else config.GAP_Y
+    gap_x = 0 if zero_gaps else lay.gap_x
+    gap_y = 0 if zero_gaps else lay.gap_y
 
-    grid_w = config.GRID_COLS * config.CARD_W + (config.GRID_COLS - 1) * gap_x
-    grid_h = config.GRID_ROWS * config.CARD_H + (config.GRID_ROWS - 1) * gap_y
+    grid_w = lay.grid_cols * lay.card_w + (lay.grid_cols - 1) * gap_x
+    grid_h = lay.grid_rows * lay.card_h + (lay.grid_rows - 1) * gap_y
 
     start_x = (page_w - grid_w) / 2
     actual_left = start_x
     actual_right = page_w - (start_x + grid_w)
 
-    if actual_left < config.PAGE_MARGIN_LEFT or actual_right < config.PAGE_MARGIN_RIGHT:
+    if actual_left < lay.page_margin_left or actual_right < lay.page_margin_right:
         print(
-            f"Warning: requested margins L={config.PAGE_MARGIN_LEFT/mm:.1f} mm, R={config.PAGE_MARGIN_RIGHT/mm:.1f} mm cannot both be maintained when centering."
+            f"Warning: requested margins L={lay.page_margin_left/mm:.1f} mm, R={lay.page_margin_right/mm:.1f} mm cannot both be maintained when centering."
         )
         print(
             f"Actual margins will be L={actual_left/mm:.1f} mm, R={actual_right/mm:.1f} mm."
             " Consider increasing margins or reducing card/gap sizes."
         )
 
-    start_y = page_h - config.PAGE_MARGIN_Y - grid_h
+    start_y = page_h - lay.page_margin_y - grid_h
 
     if start_y < 0:
         raise ValueError("Grid doesn't fit on page vertically with current settings. Adjust margins/gaps or card size.")
 
-    cards_per_page = config.GRID_COLS * config.GRID_ROWS
-    total_pages = max(1, math.ceil(len(cards) / cards_per_page))
-
-    for page in range(total_pages):
-        c.setFont(fonts.FONT_BOLD, 10)
-        c.drawString(config.PAGE_MARGIN_LEFT, page_h - 6 * mm, "Gnarl – beta cards")
-
-        start_idx = page * cards_per_page
-        end_idx = min(len(cards), start_idx + cards_per_page)
+    cards_per_page = lay.grid_cols * lay.grid_rows
+    card_iter = resolve_cards(cards, ctx.cfg)
+    empty_back = resolve_card(None, ctx.cfg)
+
+    paths: List[str] = []
+    counts: Counter = Counter()
+    c = None
+    page = 0
+    while True:
+        # only one page worth of cards is held at a time
+        page_cards = list(itertools.islice(card_iter, cards_per_page))
+        if not page_cards and page > 0:
+            break
+        if c is None:
+            path = part_path(out_path, len(paths) + 1) if pages_per_file else out_path
+            c = canvas.Canvas(path, pagesize=lay.page_size)
+            # forms belong to one document, so every part lays its cards out afresh
+            fronts = _FormCache(c, "front", draw_card_face, front_fingerprint, ctx, overlay=draw_card_footer,
+                                color=use_color, page_size=lay.page_size)
+            backs = _FormCache(c, "back", draw_back, back_fingerprint, ctx, color=use_color,
+                               page_size=lay.page_size)
+            paths.append(path)
+        # wrap the effect texts of the whole page in one batch
+        ctx.wrap_many(c, [rec.effect for rec in page_cards], lay.card_w - 2 * lay.padding, ctx.fonts.regular, lay.body_size)
+
+        c.setFont(ctx.fonts.bold, 10)
+        c.drawString(lay.page_margin_left, page_h - 6 * mm, PAGE_TITLE)
 
         for pos in range(cards_per_page):
-            card_idx = start_idx + pos
-            col = pos % config.GRID_COLS
-            r = pos // config.GRID_COLS
-            x = start_x + col * (config.CARD_W + gap_x)
-            y = start_y + (config.GRID_ROWS - 1 - r) * (config.CARD_H + gap_y)
-            if card_idx < end_idx:
-                draw_card(c, cards[card_idx], x, y, config.CARD_W, config.CARD_H, color=use_color)
-
-        c.setFont(fonts.FONT_REG, config.META_SIZE)
+            col = pos % lay.grid_cols
+            r = pos // lay.grid_cols
+            x = start_x + col * (lay.card_w + gap_x)
+            y = start_y + (lay.grid_rows - 1 - r) * (lay.card_h + gap_y)
+            if pos < len(page_cards):
+                fronts.place(page_cards[pos], x, y, lay.card_w, lay.card_h)
+
+        c.setFont(ctx.fonts.regular, lay.meta_size)
         front_label = f"{page+1}. front"
-        c.drawCentredString(page_w / 2.0, config.PAGE_MARGIN_Y / 2.0, front_label)
+        c.drawCentredString(page_w / 2.0, lay.page_margin_y / 2.0, front_label)
 
         c.showPage()
 
         for pos in range(cards_per_page):
-            card_idx = start_idx + pos
-            col = pos % config.GRID_COLS
-            r = pos // config.GRID_COLS
+            col = pos % lay.grid_cols
+            r = pos // lay.grid_cols
             # Mirror columns left<->right so backs align right-to-left for duplex printing
-            mirror_col = (config.GRID_COLS - 1 - col)
-            x = start_x + mirror_col * (config.CARD_W + gap_x)
-            y = start_y + (config.GRID_ROWS - 1 - r) * (config.CARD_H + gap_y)
-            if card_idx < len(cards):
-                draw_back(c, cards[card_idx], x, y, config.CARD_W, config.CARD_H, color=use_color)
-            else:
-                draw_back(c, None, x, y, config.CARD_W, config.CARD_H, color=use_color)
+            mirror_col = (lay.grid_cols - 1 - col)
+            x = start_x + mirror_col * (lay.card_w + gap_x)
+            y = start_y + (lay.grid_rows - 1 - r) * (lay.card_h + gap_y)
+            backs.place(page_cards[pos] if pos < len(page_cards) else empty_back, x, y, lay.card_w, lay.card_h)
 
         # Page-level footer: number this page as "N. back" and finish the back page
-        c.setFont(fonts.FONT_REG, config.META_SIZE)
+        c.setFont(ctx.fonts.regular, lay.meta_size)
         back_label = f"{page+1}. back"
-        c.drawCentredString(page_w / 2.0, config.PAGE_MARGIN_Y / 2.0, back_label)
+        c.drawCentredString(page_w / 2.0, lay.page_margin_y / 2.0, back_label)
 
         c.showPage()
-
-    c.save()
+        page += 1
+        if pages_per_file and page % pages_per_file == 0:
+            _save_part(c, fronts, backs, counts)
+            c = None
+
+    if c is not None:
+        _save_part(c, fronts, backs, counts)
+    if stats is not None:
+        stats.update(counts)
+    logging.info("Laid out %d unique fronts for %d cards (%d backs for %d slots) in %d file(s); "
+                 "%d fronts and %d backs reused from identical cards",
+                 counts["front_layouts"], counts["cards"], counts["back_layouts"], counts["back_slots"], len(paths),
+                 counts["front_duplicates"], counts["back_duplicates"])
+    return paths
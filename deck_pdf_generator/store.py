@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import dataclasses
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from .types import Card, CardRun
+from . import cache, parser, xinclude
+
+# Columns mirror the Card dataclass; tags are also exploded into card_tags
+CARD_FIELDS = [f.name for f in dataclasses.fields(Card)]
+_INT_FIELDS = {"cost", "hp", "atk", "lootBudget", "count"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS source_deps (
+    source TEXT NOT NULL REFERENCES sources(path) ON DELETE CASCADE,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    rowid INTEGER PRIMARY KEY,
+    source TEXT NOT NULL REFERENCES sources(path) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    multiplicity INTEGER NOT NULL,
+    {columns}
+);
+CREATE TABLE IF NOT EXISTS card_tags (
+    card INTEGER NOT NULL REFERENCES cards(rowid) ON DELETE CASCADE,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS source_deps_source ON source_deps(source);
+CREATE INDEX IF NOT EXISTS cards_source ON cards(source, position);
+CREATE INDEX IF NOT EXISTS cards_deck ON cards(deck);
+CREATE INDEX IF NOT EXISTS cards_type ON cards(type);
+CREATE INDEX IF NOT EXISTS cards_biome ON cards(biome);
+CREATE INDEX IF NOT EXISTS cards_id ON cards(id);
+CREATE INDEX IF NOT EXISTS card_tags_tag ON card_tags(tag, card);
+CREATE INDEX IF NOT EXISTS card_tags_card ON card_tags(card);
+""".format(columns=",\n    ".join(f"{name} {'INTEGER' if name in _INT_FIELDS else 'TEXT'}" for name in CARD_FIELDS))
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open (and create if needed) the card store at `db_path`."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _newest_mtime(paths: Sequence[str]) -> int:
+    mtime = 0
+    for p in paths:
+        try:
+            mtime = max(mtime, os.stat(p).st_mtime_ns)
+        except OSError:
+            pass
+    return mtime
+
+
+def _combined_digest(paths: Sequence[str]) -> str:
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(f"{p}\0{cache.file_digest(p)}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _insert_runs(conn: sqlite3.Connection, source: str, runs: Iterable[CardRun]) -> int:
+    placeholders = ", ".join("?" * (len(CARD_FIELDS) + 3))
+    sql = f"INSERT INTO cards (source, position, multiplicity, {', '.join(CARD_FIELDS)}) VALUES ({placeholders})"
+    n = 0
+    for position, (card, multiplicity) in enumerate(runs):
+        values = [getattr(card, name) for name in CARD_FIELDS]
+        values[CARD_FIELDS.index("tags")] = ",".join(card.tags)
+        cur = conn.execute(sql, [source, position, multiplicity] + values)
+        conn.executemany("INSERT INTO card_tags (card, tag) VALUES (?, ?)",
+                         [(cur.lastrowid, tag) for tag in card.tags])
+        n += 1
+    return n
+
+
+def sync(db_path: str, xml_paths: Sequence[str], cache_dir: Optional[str] = cache.DEFAULT_CACHE_DIR) -> Counter:
+    """Import `xml_paths` into the store, skipping files that did not change.
+
+    A file is re-imported when the combined content hash of it and the
+    XIncludes recorded at its last import differs from the stored one, so
+    edits that keep the old mtime (`cp -p`, `rsync -t`, tar extraction)
+    are picked up too; a changed mtime alone only updates the stored one.
+    The includes come from the `xinclude` dependency graph filled while
+    importing, so unchanged files are never scanned. Sources whose file
+    no longer exists are removed. Returns counts of "imported",
+    "unchanged" and "removed" files.
+    """
+    stats: Counter = Counter()
+    conn = connect(db_path)
+    try:
+        known = {path: (mtime, digest) for path, mtime, digest in conn.execute("SELECT path, mtime_ns, sha256 FROM sources")}
+        known_deps: Dict[str, List[str]] = {}
+        for source, path in conn.execute("SELECT source, path FROM source_deps ORDER BY rowid"):
+            known_deps.setdefault(source, []).append(path)
+        for xml_path in xml_paths:
+            source = os.path.abspath(xml_path)
+            old = known.get(source)
+            if old is not None:
+                paths = [source] + known_deps.get(source, [])
+                mtime = _newest_mtime(paths)
+                if _combined_digest(paths) == old[1]:
+                    if old[0] != mtime:
+                        conn.execute("UPDATE sources SET mtime_ns = ? WHERE path = ?", (mtime, source))
+                    stats["unchanged"] += 1
+                    continue
+            if cache_dir is not None:
+                runs = cache.load_card_runs(xml_path, cache_dir)
+            else:
+                runs = parser.parse_file_card_runs(xml_path)
+            deps = xinclude.dependencies(source)
+            paths = [source] + deps
+            mtime = _newest_mtime(paths)
+            digest = _combined_digest(paths)
+            with conn:
+                conn.execute("DELETE FROM sources WHERE path = ?", (source,))
+                conn.execute("INSERT INTO sources (path, mtime_ns, sha256) VALUES (?, ?, ?)", (source, mtime, digest))
+                conn.executemany("INSERT INTO source_deps (source, path) VALUES (?, ?)", [(source, p) for p in deps])
+                n = _insert_runs(conn, source, runs)
+            logging.info("Imported %d cards from %s", n, xml_path)
+            stats["imported"] += 1
+        for source in known:
+            if not os.path.exists(source):
+                conn.execute("DELETE FROM sources WHERE path = ?", (source,))
+                stats["removed"] += 1
+        conn.commit()
+    finally:
+        conn.close()
+    return stats
+
+
+def query_card_runs(db_path: str, where: str = "1", params: Sequence = ()) -> List[CardRun]:
+    """Return card runs matching the SQL `where` clause, in source order.
+
+    The clause may use any `cards` column, e.g. "deck = 'monster'", or
+    tags through "rowid IN (SELECT card FROM card_tags WHERE tag = 'boss')".
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            f"SELECT multiplicity, {', '.join(CARD_FIELDS)} FROM cards WHERE {where} ORDER BY source, position",
+            params,
+        ).fetchall()
+    finally:
+        conn.close()
+    return list(_rows_to_runs(rows))
+
+
+def _rows_to_runs(rows) -> Iterator[CardRun]:
+    for row in rows:
+        kwargs = dict(zip(CARD_FIELDS, row[1:]))
+        kwargs["tags"] = tuple(kwargs["tags"].split(",")) if kwargs["tags"] else ()
+        yield Card(**kwargs), row[0]
@@ -0,0 +1,267 @@
+import itertools
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from .types import Card, CardRun
+
+try:
+    import numpy as np  # type: ignore
+except Exception:
+    np = None
+
+# Integer columns; None is flagged in a parallel null mask
+INT_FIELDS = ("cost", "hp", "atk", "lootBudget", "count")
+# Dictionary-encoded columns; code 0 always means None
+CATEGORY_FIELDS = ("type", "deck", "school", "biome", "slot", "klass")
+# Free-form columns kept as plain lists
+TEXT_FIELDS = ("id", "name", "subtitle", "effect", "back_icon", "front_icon", "tags")
+
+# Range of the 64-bit integer columns
+INT_MIN, INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _int_value(field: str, value) -> int:
+    """Coerce a filter value for the integer column `field` ("3", 3.0 -> 3)."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise ValueError(f"Cannot filter integer column {field!r} by {value!r}")
+
+
+class CardTable:
+    """Columnar storage for parsed cards.
+
+    Each row is one unique card; the `count` column holds how many copies
+    of it are printed. Numeric columns are `array('q')` with a `bytearray`
+    null mask each (1 where the value is None), categorical ones are
+    dictionary-encoded `array('I')` codes plus a per-column vocabulary.
+    Filters and aggregations work on whole columns (with NumPy when it is
+    installed) instead of looping over `Card` objects.
+    """
+
+    def __init__(self) -> None:
+        self.ints: Dict[str, array] = {f: array("q") for f in INT_FIELDS}
+        self.nulls: Dict[str, bytearray] = {f: bytearray() for f in INT_FIELDS}
+        self.codes: Dict[str, array] = {f: array("I") for f in CATEGORY_FIELDS}
+        self.vocab: Dict[str, List[Optional[str]]] = {f: [None] for f in CATEGORY_FIELDS}
+        self._lookup: Dict[str, Dict[Optional[str], int]] = {f: {None: 0} for f in CATEGORY_FIELDS}
+        self.text: Dict[str, list] = {f: [] for f in TEXT_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.ints["count"])
+
+    # -- construction / conversion ------------------------------------
+
+    def _encode(self, field: str, value: Optional[str]) -> int:
+        lookup = self._lookup[field]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.vocab[field])
+            self.vocab[field].append(value)
+        return code
+
+    def append(self, card: Card, count: Optional[int] = None) -> None:
+        """Append `card` as a row printed `count` times (default `card.count`).
+
+        Raises ValueError for integers outside the 64-bit column range.
+        """
+        for f in INT_FIELDS:
+            value = count if f == "count" and count is not None else getattr(card, f)
+            if value is not None and not INT_MIN <= value <= INT_MAX:
+                raise ValueError(f"Card {card.id!r}: {f}={value} does not fit a 64-bit integer column")
+        for f in INT_FIELDS:
+            value = count if f == "count" and count is not None else getattr(card, f)
+            self.ints[f].append(0 if value is None else value)
+            self.nulls[f].append(value is None)
+        for f in CATEGORY_FIELDS:
+            self.codes[f].append(self._encode(f, getattr(card, f)))
+        for f in TEXT_FIELDS:
+            self.text[f].append(getattr(card, f))
+
+    @classmethod
+    def from_runs(cls, runs: Iterable[CardRun]) -> "CardTable":
+        table = cls()
+        for card, n in runs:
+            table.append(card, n)
+        return table
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[Card]) -> "CardTable":
+        """Build a table from printed cards.
+
+        Consecutive copies of the same instance (as produced by
+        `parser.expand_runs()`) collapse into a single row.
+        """
+        table = cls()
+        for _, group in itertools.groupby(cards, key=id):
+            copies = list(group)
+            table.append(copies[0], len(copies))
+        return table
+
+    def row(self, i: int) -> Card:
+        kwargs = {}
+        for f in INT_FIELDS:
+            kwargs[f] = None if self.nulls[f][i] else self.ints[f][i]
+        for f in CATEGORY_FIELDS:
+            kwargs[f] = self.vocab[f][self.codes[f][i]]
+        for f in TEXT_FIELDS:
+            kwargs[f] = self.text[f][i]
+        return Card(**kwargs)
+
+    def to_runs(self) -> Iterator[CardRun]:
+        counts = self.ints["count"]
+        for i in range(len(self)):
+            yield self.row(i), counts[i]
+
+    def to_cards(self) -> List[Card]:
+        cards: List[Card] = []
+        for card, n in self.to_runs():
+            cards.extend([card] * n)
+        return cards
+
+    @classmethod
+    def concat(cls, tables: Sequence["CardTable"]) -> "CardTable":
+        """Concatenate `tables`, merging their category vocabularies."""
+        out = cls()
+        for t in tables:
+            for f in INT_FIELDS:
+                out.ints[f].extend(t.ints[f])
+                out.nulls[f].extend(t.nulls[f])
+            for f in CATEGORY_FIELDS:
+                remap = array("I", (out._encode(f, v) for v in t.vocab[f]))
+                out.codes[f].extend(remap[c] for c in t.codes[f])
+            for f in TEXT_FIELDS:
+                out.text[f].extend(t.text[f])
+        return out
+
+    # -- column operations ----------------------------------------------
+
+    def mask(self, field: str, value):
+        """Return a row mask where `field == value`.
+
+        Values for integer columns may also be integral strings or floats;
+        anything else raises ValueError. The mask is a boolean NumPy array
+        when NumPy is installed and a list of bools otherwise.
+        """
+        n = len(self)
+        if field in self.codes:
+            code = self._lookup[field].get(value)
+            if code is None:
+                return np.zeros(n, dtype=bool) if np is not None else [False] * n
+            column = self.codes[field]
+            if np is not None:
+                return np.frombuffer(column, dtype=column.typecode) == code
+            return list(map(code.__eq__, column))
+        nulls = self.nulls[field]
+        if value is None:
+            return np.frombuffer(nulls, dtype=np.bool_).copy() if np is not None else list(map(bool, nulls))
+        value = _int_value(field, value)
+        if not INT_MIN <= value <= INT_MAX:
+            return np.zeros(n, dtype=bool) if np is not None else [False] * n
+        column = self.ints[field]
+        if np is not None:
+            return (np.frombuffer(column, dtype=column.typecode) == value) & ~np.frombuffer(nulls, dtype=np.bool_)
+        return [v == value and not null for v, null in zip(column, nulls)]
+
+    def take(self, rows: Iterable[int]) -> "CardTable":
+        """Return a new table with the given row indices (in that order)."""
+        out = CardTable()
+        if np is not None:
+            idx = np.asarray(rows if isinstance(rows, np.ndarray) else list(rows), dtype=np.intp)
+            for f in INT_FIELDS:
+                out.ints[f] = array("q", np.frombuffer(self.ints[f], dtype="q")[idx].tobytes())
+                out.nulls[f] = bytearray(np.frombuffer(self.nulls[f], dtype=np.uint8)[idx].tobytes())
+            for f in CATEGORY_FIELDS:
+                out.codes[f] = array("I", np.frombuffer(self.codes[f], dtype="I")[idx].tobytes())
+            rows = idx.tolist()
+        else:
+            rows = list(rows)
+            for f in INT_FIELDS:
+                out.ints[f] = array("q", map(self.ints[f].__getitem__, rows))
+                out.nulls[f] = bytearray(map(self.nulls[f].__getitem__, rows))
+            for f in CATEGORY_FIELDS:
+                out.codes[f] = array("I", map(self.codes[f].__getitem__, rows))
+        for f in CATEGORY_FIELDS:
+            out.vocab[f] = list(self.vocab[f])
+            out._lookup[f] = dict(self._lookup[f])
+        for f in TEXT_FIELDS:
+            out.text[f] = list(map(self.text[f].__getitem__, rows))
+        return out
+
+    def filter(self, **equals) -> "CardTable":
+        """Return rows where every `field=value` pair matches."""
+        selected = None
+        for field, value in equals.items():
+            m = self.mask(field, value)
+            if selected is None:
+                selected = m
+            elif np is not None:
+                selected &= m
+            else:
+                selected = list(map(bool.__and__, selected, m))
+        if selected is None:
+            return self.take(range(len(self)))
+        if np is not None:
+            return self.take(np.flatnonzero(selected))
+        return self.take(itertools.compress(range(len(self)), selected))
+
+    def histogram(self, field: str, weighted: bool = True, default: Optional[str] = None,
+                  rows: Optional[Sequence[int]] = None) -> Counter:
+        """Count rows per value of a categorical `field`.
+
+        With `weighted` each row counts as many times as it is printed.
+        None values are reported under `default`. `rows` restricts the
+        count to those row indices (e.g. `CardIndex.positions()`).
+        """
+        codes = self.codes[field]
+        counts = self.ints["count"]
+        vocab = self.vocab[field]
+        if np is not None:
+            code_col = np.frombuffer(codes, dtype="I")
+            weights = np.frombuffer(counts, dtype="q") if weighted else None
+            if rows is not None:
+                idx = np.asarray(rows, dtype=np.intp)
+                code_col = code_col[idx]
+                weights = weights[idx] if weighted else None
+            sums = np.bincount(code_col, weights=weights, minlength=len(vocab))
+            totals = {code: int(n) for code, n in enumerate(sums) if n}
+        else:
+            if rows is not None:
+                codes = [codes[i] for i in rows]
+                counts = [counts[i] for i in rows]
+            if weighted:
+                totals = Counter()
+                for code, n in zip(codes, counts):
+                    totals[code] += n
+            else:
+                totals = Counter(codes)
+        out: Counter = Counter()
+        for code, n in totals.items():
+            value = vocab[code]
+            out[default if value is None else value] += n
+        return out
+
+    def group_rows(self, field: str) -> Dict[Optional[str], Sequence[int]]:
+        """Return row indices grouped by value of a categorical `field`.
+
+        Groups are ordered by category code; with NumPy each group is an
+        index array (usable with `take()`), otherwise a list.
+        """
+        codes = self.codes[field]
+        vocab = self.vocab[field]
+        if np is not None:
+            column = np.frombuffer(codes, dtype="I")
+            # a stable sort keeps the rows of each group in table order
+            order = np.argsort(column, kind="stable")
+            present, starts = np.unique(column[order], return_index=True)
+            return {vocab[code]: rows for code, rows in zip(present.tolist(), np.split(order, starts[1:]))}
+        groups: Dict[int, List[int]] = {}
+        for i, code in enumerate(codes):
+            groups.setdefault(code, []).append(i)
+        return {vocab[code]: groups[code] for code in sorted(groups)}
@@ -1,8 +1,34 @@
+import sys
+import functools
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterable, Optional, Tuple
 
+# Distinct tag combinations shared between cards. Most decks use a handful;
+# the bound keeps procedurally tagged decks from growing it per card.
+TAG_CACHE_SIZE = 1024
 
-@dataclass
+
+@functools.lru_cache(maxsize=TAG_CACHE_SIZE)
+def _shared_tags(tags: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tags
+
+
+def intern_tags(tags: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Return a shared tuple holding interned `tags` (empty tuple for None).
+
+    Recently used combinations are shared (up to `TAG_CACHE_SIZE`), so
+    memory stays bounded when streaming decks with per-card tags.
+    """
+    if not tags:
+        return ()
+    return _shared_tags(tuple(sys.intern(t) for t in tags))
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+@dataclass(slots=True)
 class Card:
     id: str
     type: str
@@ -21,4 +47,20 @@ class Card:
     front_icon: Optional[str] = None
     deck: Optional[str] = None
     count: int = 1
-    tags: List[str] = None
+    tags: Tuple[str, ...] = ()
+
+    def __post_init__(self) -> None:
+        # categorical fields draw from a small vocabulary; share the strings
+        self.type = _intern(self.type)
+        self.deck = _intern(self.deck)
+        self.school = _intern(self.school)
+        self.slot = _intern(self.slot)
+        self.klass = _intern(self.klass)
+        self.biome = _intern(self.biome)
+        self.front_icon = _intern(self.front_icon)
+        self.back_icon = _intern(self.back_icon)
+        self.tags = intern_tags(self.tags)
+
+
+# A parsed card paired with how many copies of it are printed
+CardRun = Tuple[Card, int]
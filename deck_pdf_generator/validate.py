@@ -0,0 +1,347 @@
+import os
+import hashlib
+import logging
+import unicodedata
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from . import cache, config, deckpack, fonts, parser, render, xinclude
+
+# Compiled schemas for this process, keyed by absolute XSD path
+_SCHEMAS: Dict[str, Tuple[str, object]] = {}
+
+
+def load_schema(xsd_path: str):
+    """Return the compiled `lxml.etree.XMLSchema` for `xsd_path`.
+
+    Schemas are compiled once per process and recompiled only when the
+    XSD content changes.
+    """
+    from lxml import etree as LET  # type: ignore
+
+    key = os.path.abspath(xsd_path)
+    digest = cache.file_digest(xsd_path)
+    hit = _SCHEMAS.get(key)
+    if hit is not None and hit[0] == digest:
+        return hit[1]
+    schema = LET.XMLSchema(LET.parse(xsd_path))
+    _SCHEMAS[key] = (digest, schema)
+    return schema
+
+
+def _record_path(xml_path: str, xsd_path: str, cache_dir: str) -> str:
+    key = f"{cache.file_digest(xsd_path)}:{cache.file_digest(xml_path)}"
+    return os.path.join(cache_dir, "validated", hashlib.sha256(key.encode("ascii")).hexdigest())
+
+
+def validate_xml(xml_path: str, xsd_path: str, cache_dir: Optional[str] = None) -> None:
+    """Validate `xml_path` against XSD at `xsd_path` if lxml is available.
+
+    When `cache_dir` is given, a successful validation is recorded under
+    it keyed by (schema hash, document hash), and documents with such a
+    record are not validated again. Raises RuntimeError when the document
+    does not conform to the schema.
+    """
+    try:
+        from lxml import etree as LET  # type: ignore
+    except Exception:
+        logging.warning("lxml not available; skipping XSD validation for %s", xml_path)
+        return
+
+    record = _record_path(xml_path, xsd_path, cache_dir) if cache_dir is not None else None
+    if record is not None and os.path.exists(record):
+        cache.STATS["validated"] += 1
+        logging.info("XML %s already validated against %s", xml_path, xsd_path)
+        return
+
+    schema = load_schema(xsd_path)
+    doc = LET.parse(xml_path)
+    if not schema.validate(doc):
+        raise RuntimeError(f"XML {xml_path} failed XSD validation against {xsd_path}")
+
+    if record is not None:
+        try:
+            os.makedirs(os.path.dirname(record), exist_ok=True)
+            open(record, "w").close()
+        except OSError as e:
+            logging.warning("Could not record validation of %s: %s", xml_path, e)
+
+
+@dataclass
+class Issue:
+    """A schema or semantic problem found by `check_file`."""
+    path: str
+    line: Optional[int]
+    message: str
+
+    def __str__(self) -> str:
+        if self.line:
+            return f"{self.path}:{self.line}: {self.message}"
+        return f"{self.path}: {self.message}"
+
+
+# (child element or "." for <card> itself, attribute, value the parser falls back to)
+_INT_ATTRIBUTES = (
+    (".", "cost", "0"),
+    (".", "count", "1"),
+    ("loot", "cost", "0"),
+    ("monster", "hp", "no value"),
+    ("monster", "atk", "no value"),
+    ("monster", "lootBudget", "no value"),
+    ("monster", "lootbudget", "no value"),
+)
+
+
+def _node_path(node, default: str) -> str:
+    base = getattr(node, "base", None)
+    if base:
+        return base[len("file://"):] if base.startswith("file://") else base
+    return default
+
+
+def _int_problem(cid: str, where: str, attr: str, raw: str, fallback: str) -> Optional[str]:
+    """Describe why the parser would not use `raw` as the integer `attr`, or None."""
+    try:
+        value = int(raw)
+    except ValueError:
+        return f"card {cid!r}: {where}{attr}={raw!r} is not an integer (parsed as {fallback})"
+    if attr == "count" and value < 1:
+        return f"card {cid!r}: count={value} is less than 1 (parsed as 1)"
+    return None
+
+
+def _check_card(node, xml_path: str) -> List[Issue]:
+    issues: List[Issue] = []
+    cid = node.attrib.get("id") or (node.findtext("name") or "").strip() or "?"
+    for child, attr, fallback in _INT_ATTRIBUTES:
+        el = node if child == "." else node.find(child)
+        if el is None or attr not in el.attrib:
+            continue
+        where = f"<{child}> " if child != "." else ""
+        problem = _int_problem(cid, where, attr, el.attrib[attr].strip(), fallback)
+        if problem:
+            issues.append(Issue(_node_path(el, xml_path), getattr(el, "sourceline", None), problem))
+    return issues
+
+
+# Integer columns of JSONL / CSV rows, with the value the parser falls back to
+_INT_COLUMNS = (
+    ("cost", "0"),
+    ("count", "1"),
+    ("hp", "no value"),
+    ("atk", "no value"),
+    ("lootBudget", "no value"),
+)
+
+
+def _check_row(attrib: Mapping[str, str], path: str, lineno: int) -> List[Issue]:
+    issues: List[Issue] = []
+    cid = attrib.get("id") or attrib.get("name", "").strip() or "?"
+    for attr, fallback in _INT_COLUMNS:
+        if attr in attrib:
+            problem = _int_problem(cid, "", attr, attrib[attr].strip(), fallback)
+            if problem:
+                issues.append(Issue(path, lineno, problem))
+    return issues
+
+
+def check_rows(path: str) -> List[Issue]:
+    """Collect the semantic issues of a JSONL / CSV card file.
+
+    Rows get the same checks as `<card>` elements in `check_file`, reported
+    at their line. A line that is not a card row (invalid JSON, a value
+    other than an object) ends the check, like an XML syntax error.
+    """
+    issues: List[Issue] = []
+    try:
+        for lineno, attrib in parser.iter_file_rows(path):
+            issues.extend(_check_row(attrib, path, lineno))
+    except parser.RowError as e:
+        issues.append(Issue(e.path, e.line, e.message))
+    return issues
+
+
+def check_file(xml_path: str, xsd_path: Optional[str] = None) -> List[Issue]:
+    """Collect every schema and semantic issue in `xml_path`.
+
+    Unlike `validate_xml` this never raises on invalid content; syntax
+    errors, all XSD violations and integer attributes the parser would
+    silently replace are returned with their line numbers. Semantic checks
+    run on the XInclude-resolved tree and point into the included file.
+    """
+    try:
+        from lxml import etree as LET  # type: ignore
+    except Exception:
+        LET = None
+
+    issues: List[Issue] = []
+    if LET is None:
+        try:
+            root = ET.parse(xml_path).getroot()
+        except ET.ParseError as e:
+            return [Issue(xml_path, e.position[0], str(e))]
+        if xsd_path:
+            logging.warning("lxml not available; skipping XSD validation for %s", xml_path)
+    else:
+        try:
+            doc = LET.parse(xml_path)
+        except LET.XMLSyntaxError as e:
+            return [Issue(xml_path, e.lineno, e.msg)]
+        if xsd_path:
+            schema = load_schema(xsd_path)
+            if not schema.validate(doc):
+                for err in schema.error_log:
+                    issues.append(Issue(err.filename or xml_path, err.line, err.message))
+        try:
+            xinclude.resolve(doc, xml_path)
+        except LET.XIncludeError as e:
+            issues.append(Issue(xml_path, None, f"XInclude failed: {e}"))
+        root = doc.getroot()
+
+    for node in root.findall("card"):
+        issues.extend(_check_card(node, xml_path))
+    return issues
+
+
+def _check_file_safe(xml_path: str, xsd_path: Optional[str]) -> List[Issue]:
+    try:
+        if os.path.splitext(xml_path)[1].lower() in parser.ROW_READERS:
+            return check_rows(xml_path)
+        return check_file(xml_path, xsd_path)
+    except Exception as e:
+        return [Issue(xml_path, None, f"{type(e).__name__}: {e}")]
+
+
+def check_files(xml_paths: Sequence[str], xsd_path: Optional[str] = None, jobs: int = 1) -> List[Issue]:
+    """Run `check_file` (`check_rows` for JSONL / CSV) on every path, optionally in a process pool.
+
+    Issues are returned grouped by file in the order of `xml_paths`.
+    """
+    if jobs <= 1 or len(xml_paths) <= 1:
+        results = [_check_file_safe(p, xsd_path) for p in xml_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(xml_paths))) as pool:
+            results = list(pool.map(_check_file_safe, xml_paths, [xsd_path] * len(xml_paths)))
+    return [issue for file_issues in results for issue in file_issues]
+
+
+# Cards listed per character by `MissingGlyph.__str__`
+MAX_CARDS_SHOWN = 10
+
+
+@dataclass
+class MissingGlyph:
+    """A drawn character that none of the registered fonts has a glyph for."""
+    char: str
+    # "path:card id" of every card drawing it, or "icons.xml path:key" for configured icons
+    cards: List[str]
+
+    def __str__(self) -> str:
+        shown = ", ".join(self.cards[:MAX_CARDS_SHOWN])
+        if len(self.cards) > MAX_CARDS_SHOWN:
+            shown += f" (+{len(self.cards) - MAX_CARDS_SHOWN} more)"
+        return f"U+{ord(self.char):04X} {self.char!r}: {shown}"
+
+
+_covered: Optional[Set[str]] = None
+
+
+def _covered_chars(cache_dir: Optional[str] = None) -> Set[str]:
+    """Return every character some font of the fallback chain has a glyph for."""
+    global _covered
+    if _covered is None:
+        fs = fonts.load_fonts(cache_dir)
+        covered: Set[str] = set()
+        for name in dict.fromkeys(fs.chain(fs.regular) + (fs.bold,)):
+            cov = fonts.coverage(name)
+            if cov is None:
+                logging.warning("Font %s has no glyph table; characters only it could draw are reported missing", name)
+            else:
+                covered.update(cov)
+        _covered = covered
+    return _covered
+
+
+def _missing_chars(texts: Iterable[Optional[str]], covered: Set[str]) -> Set[str]:
+    chars = set("".join(t for t in texts if t)) - covered
+    # whitespace, joiners and variation selectors are never drawn on their own
+    return {ch for ch in chars
+            if not ch.isspace() and unicodedata.category(ch) not in ("Cc", "Cf") and not "\ufe00" <= ch <= "\ufe0f"}
+
+
+def _drawn_texts(rec: render.RenderRecord) -> Iterator[Optional[str]]:
+    """Yield every string `render` draws for `rec` (glyphs only where no image replaces them)."""
+    yield from (rec.title, rec.subtitle, rec.meta, rec.stats, rec.footer, rec.cost_text,
+                rec.back_cost, rec.back_label, rec.back_biome_glyph)
+    yield (rec.effect or "").replace("\\n", "\n")
+    if not rec.small_image:
+        yield rec.left_icon
+    if not rec.front_image:
+        yield rec.front_glyph
+    if not rec.back_image:
+        yield rec.back_glyph
+
+
+def _file_missing_glyphs(path: str, config_path: Optional[str], cache_dir: Optional[str]) -> Dict[str, List[str]]:
+    if config_path:
+        config.set_config_path(config_path)
+    cfg = config.load_config()
+    covered = _covered_chars(cache_dir)
+    missing: Dict[str, List[str]] = {}
+    if deckpack.is_deckpack(path):
+        with deckpack.DeckPack(path) as pack:
+            runs = list(pack.runs())
+    else:
+        runs = parser.iter_file_card_runs(path)
+    for card, _ in runs:
+        for ch in _missing_chars(_drawn_texts(render.resolve_card(card, cfg)), covered):
+            missing.setdefault(ch, []).append(f"{path}:{card.id}")
+    return missing
+
+
+def _file_missing_glyphs_safe(path: str, config_path: Optional[str],
+                              cache_dir: Optional[str]) -> Tuple[Dict[str, List[str]], Optional[str]]:
+    try:
+        return _file_missing_glyphs(path, config_path, cache_dir), None
+    except Exception as e:
+        return {}, f"{type(e).__name__}: {e}"
+
+
+def audit_glyphs(paths: Sequence[str], jobs: int = 1, config_path: Optional[str] = None,
+                 cache_dir: Optional[str] = None) -> List[MissingGlyph]:
+    """Report every character drawn for the cards of `paths` that no registered font can draw.
+
+    Each file is resolved like for rendering (names, effect texts, stat
+    and cost lines, the icons from icons.xml and the ones `render` adds
+    itself) and checked against the cmaps of the whole font fallback
+    chain, optionally in a process pool. The configured icons are
+    checked as well, including ones no card uses. Files that cannot be
+    read are logged and skipped. Results are sorted by codepoint.
+    Parsed fonts are cached under `cache_dir` when one is given.
+    """
+    args = (paths, [config_path] * len(paths), [cache_dir] * len(paths))
+    if jobs <= 1 or len(paths) <= 1:
+        results = list(map(_file_missing_glyphs_safe, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+            results = list(pool.map(_file_missing_glyphs_safe, *args))
+
+    merged: Dict[str, List[str]] = {}
+    for path, (missing, error) in zip(paths, results):
+        if error:
+            logging.warning("Skipping glyph audit of %s: %s", path, error)
+        for ch, cards in missing.items():
+            merged.setdefault(ch, []).extend(cards)
+
+    cfg = config.load_config(config_path)
+    covered = _covered_chars(cache_dir)
+    pages = [render.PAGE_TITLE] + list(_drawn_texts(render.resolve_card(None, cfg)))
+    for ch in _missing_chars(pages, covered):
+        merged.setdefault(ch, []).append("(page title / empty back)")
+    for mapping in (cfg.type_icons, cfg.front_deck_icons, cfg.back_deck_icons, cfg.loot_front_defaults,
+                    cfg.front_biome_icons):
+        for key, icon in mapping.items():
+            for ch in _missing_chars([icon], covered):
+                merged.setdefault(ch, []).append(f"{cfg.path}:{key}")
+    return [MissingGlyph(ch, list(dict.fromkeys(merged[ch]))) for ch in sorted(merged)]
@@ -0,0 +1,279 @@
+"""XInclude resolution with a process-wide fragment cache.
+
+Deck files usually include the same shared fragments (loot tables, biome
+lists). Instead of letting lxml re-read them for every deck, `resolve()`
+parses each included file once per process, keyed by its path, mtime and
+size, and splices copies of the cached nodes into the including document.
+Includes this module does not handle itself (`parse="text"`, pointers
+other than `xpointer(<xpath>)`, remote hrefs, include cycles) are left to
+lxml's own `xinclude()`.
+
+Every resolved document records its direct includes, so the dependency
+graph of a run can be queried with `dependencies()` and `dependents()`.
+The parsed-deck cache and the card store take their dependency lists
+from this graph.
+"""
+import os
+import copy
+import logging
+import posixpath
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+XINCLUDE_NS = "http://www.w3.org/2001/XInclude"
+XINCLUDE_TAG = f"{{{XINCLUDE_NS}}}include"
+XML_BASE = "{http://www.w3.org/XML/1998/namespace}base"
+
+Stamp = Tuple[int, int]
+# (stamps of the fragment and of everything it includes, resolved root element)
+Fragment = Tuple[Dict[str, Stamp], object]
+
+_FRAGMENTS: Dict[str, Fragment] = {}
+# Direct includes of every document resolved in this process, by absolute path
+_GRAPH: Dict[str, Set[str]] = {}
+STATS: Counter = Counter()
+
+
+def _stamp(path: str) -> Optional[Stamp]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _local_path(href: str, base_path: str) -> Optional[str]:
+    if href.startswith("file://"):
+        href = href[len("file://"):]
+    elif "://" in href:
+        return None
+    return os.path.normpath(os.path.join(os.path.dirname(base_path), href))
+
+
+def load_fragment(path: str, _active: Tuple[str, ...] = (), huge_tree: bool = False) -> Optional[Fragment]:
+    """Return the cached, XInclude-resolved fragment at `path`.
+
+    The fragment is parsed again only when it or one of its own includes
+    changed on disk; `huge_tree` lifts libxml2's size limits for that
+    parse. Returns None when the file is missing or not well-formed;
+    callers then leave the include to lxml so that it reports the error.
+    """
+    from lxml import etree as LET  # type: ignore
+
+    path = os.path.abspath(path)
+    hit = _FRAGMENTS.get(path)
+    if hit is not None and all(_stamp(p) == s for p, s in hit[0].items()):
+        STATS["fragment_hit"] += 1
+        return hit
+    stamp = _stamp(path)
+    if stamp is None:
+        return None
+    try:
+        tree = LET.parse(path, LET.XMLParser(huge_tree=huge_tree))
+    except LET.XMLSyntaxError as e:
+        logging.warning("Cannot parse XInclude fragment %s: %s", path, e)
+        return None
+    STATS["fragment_miss"] += 1
+    stamps = {path: stamp}
+    _GRAPH[path] = set()
+    stamps.update(_resolve_tree(tree, path, _active + (path,), huge_tree))
+    fragment = _FRAGMENTS[path] = (stamps, tree.getroot())
+    return fragment
+
+
+def _select(root, xpointer: Optional[str]) -> Optional[list]:
+    """Return copies of the nodes of `root` selected by `xpointer`, or None if unsupported."""
+    if xpointer is None:
+        return [copy.deepcopy(root)]
+    xpointer = xpointer.strip()
+    if not (xpointer.startswith("xpointer(") and xpointer.endswith(")")):
+        return None
+    # copying the whole fragment once is much cheaper than one copy per node
+    root = copy.deepcopy(root)
+    try:
+        nodes = root.xpath(xpointer[len("xpointer("):-1])
+    except Exception:
+        return None
+    if not isinstance(nodes, list) or not all(hasattr(n, "tag") for n in nodes):
+        return None
+    return nodes
+
+
+def _rebase(nodes: list, href: str) -> list:
+    for node in nodes:
+        node.tail = None
+        if isinstance(node.tag, str):
+            # same xml:base fixup as libxml2, so `.base` points into the fragment
+            base = node.get(XML_BASE)
+            node.set(XML_BASE, posixpath.join(posixpath.dirname(href), base) if base else href)
+    return nodes
+
+
+def _include_nodes(include, base_path: str, active: Tuple[str, ...], stamps: Dict[str, Stamp],
+                   huge_tree: bool = False) -> Optional[list]:
+    """Return copies of the nodes `include` expands to, or None to leave it to lxml."""
+    href = include.get("href")
+    target = _local_path(href, base_path) if href else None
+    if target is None:
+        return None
+    _GRAPH.setdefault(base_path, set()).add(target)
+    # stamped even when the include is left to lxml, which reads the target
+    # from disk: a cached fragment must be refreshed when it changes
+    stamps.setdefault(target, _stamp(target))
+    if include.get("parse", "xml") != "xml" or target in active:
+        return None
+    fragment = load_fragment(target, active, huge_tree)
+    if fragment is None:
+        return None
+    stamps.update(fragment[0])
+    nodes = _select(fragment[1], include.get("xpointer"))
+    if nodes is None:
+        return None
+    return _rebase(nodes, href)
+
+
+def _splice(include, nodes: list) -> None:
+    parent = include.getparent()
+    tail = include.tail
+    include.tail = None
+    # addnext() is O(1), unlike inserting by index
+    prev = include
+    for node in nodes:
+        prev.addnext(node)
+        prev = node
+    if tail:
+        if nodes:
+            nodes[-1].tail = tail
+        else:
+            before = include.getprevious()
+            if before is not None:
+                before.tail = (before.tail or "") + tail
+            else:
+                parent.text = (parent.text or "") + tail
+    parent.remove(include)
+
+
+def _resolve_tree(tree, path: str, active: Tuple[str, ...], huge_tree: bool = False) -> Dict[str, Stamp]:
+    stamps: Dict[str, Stamp] = {}
+    leftover = False
+    for include in list(tree.iter(XINCLUDE_TAG)):
+        if include.getparent() is None or any(a.tag == XINCLUDE_TAG for a in include.iterancestors()):
+            # the root element, or an include inside another include's fallback
+            leftover = leftover or include.getparent() is None
+            target = _local_path(include.get("href"), path) if include.get("href") else None
+            if target is not None:
+                stamps.setdefault(target, _stamp(target))
+            continue
+        nodes = _include_nodes(include, path, active, stamps, huge_tree)
+        if nodes is None:
+            leftover = True
+        else:
+            _splice(include, nodes)
+    if leftover:
+        tree.xinclude()
+    return stamps
+
+
+def resolve(tree, path: Optional[str] = None) -> None:
+    """Resolve the XIncludes of the lxml `tree` in place.
+
+    `path` is the document location hrefs are relative to (defaults to
+    the URL the tree was parsed from). Raises `lxml.etree.XIncludeError`
+    like `tree.xinclude()` for includes that cannot be resolved.
+    """
+    path = os.path.abspath(path or tree.docinfo.URL)
+    _GRAPH[path] = set()
+    _resolve_tree(tree, path, (path,))
+
+
+def _xinclude_copy(node, base_path: str, huge_tree: bool) -> list:
+    """Resolve a copy of `node` with lxml in a throw-away wrapper document and return the wrapper's children."""
+    from lxml import etree as LET  # type: ignore
+
+    # lxml's xinclude() parses with the options of the document's parser
+    wrapper = LET.XMLParser(huge_tree=huge_tree).makeelement("cards")
+    node = copy.deepcopy(node)
+    wrapper.append(node)
+    for inc in node.iter(XINCLUDE_TAG):
+        href = inc.get("href")
+        if href:
+            inc.set("href", os.path.join(os.path.dirname(base_path), href))
+    LET.ElementTree(wrapper).xinclude()
+    return list(wrapper)
+
+
+def include_nodes(include, base_path: str, huge_tree: bool = False) -> list:
+    """Return the nodes a single detached `<xi:include>` element expands to.
+
+    Used when streaming a deck, where the include is not part of a
+    complete tree. Falls back to resolving a throw-away wrapper document
+    with lxml. `huge_tree` lifts libxml2's size limits for the included
+    files, as for the streamed deck itself.
+    """
+    base_path = os.path.abspath(base_path)
+    nodes = _include_nodes(include, base_path, (base_path,), {}, huge_tree)
+    if nodes is not None:
+        return nodes
+    return _xinclude_copy(include, base_path, huge_tree)
+
+
+def resolve_element(elem, base_path: str, huge_tree: bool = False):
+    """Resolve the XIncludes inside `elem` (e.g. a streamed `<card>`) and return the result.
+
+    Includes this module handles are spliced into `elem` in place. When
+    some are left to lxml (`parse="text"`, other pointers), a resolved
+    copy of `elem` is returned instead.
+    """
+    includes = [inc for inc in elem.iter(XINCLUDE_TAG)
+                if not any(a.tag == XINCLUDE_TAG for a in inc.iterancestors())]
+    if not includes:
+        return elem
+    base_path = os.path.abspath(base_path)
+    leftover = False
+    for include in includes:
+        nodes = _include_nodes(include, base_path, (base_path,), {}, huge_tree)
+        if nodes is None:
+            leftover = True
+        else:
+            _splice(include, nodes)
+    if not leftover:
+        return elem
+    return _xinclude_copy(elem, base_path, huge_tree)[0]
+
+
+def record(path: str, includes: Iterable[str]) -> None:
+    """Record `includes` as the dependencies of `path` without resolving it.
+
+    Used for documents served from the parsed-deck cache, whose entry
+    lists everything they include.
+    """
+    _GRAPH[os.path.abspath(path)] = set(includes)
+
+
+def dependencies(path: str) -> List[str]:
+    """Return every file `path` was seen to include, directly or transitively."""
+    seen: Set[str] = set()
+    pending = [os.path.abspath(path)]
+    while pending:
+        for dep in _GRAPH.get(pending.pop(), ()):
+            if dep not in seen:
+                seen.add(dep)
+                pending.append(dep)
+    return sorted(seen)
+
+
+def dependents(path: str) -> List[str]:
+    """Return every document that includes `path`, directly or transitively."""
+    path = os.path.abspath(path)
+    return sorted(doc for doc in _GRAPH if path in dependencies(doc))
+
+
+def dependency_graph() -> Dict[str, List[str]]:
+    """Return the direct includes of every document resolved so far."""
+    return {doc: sorted(deps) for doc, deps in _GRAPH.items()}
+
+
+def clear() -> None:
+    """Drop all cached fragments and the recorded dependency graph."""
+    _FRAGMENTS.clear()
+    _GRAPH.clear()
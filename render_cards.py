@@ -9,42 +9,60 @@ from __future__ import annotations
 
 import os
 import glob
+import sqlite3
 import argparse
 import logging
-from typing import List, Optional
+from typing import List
 from collections import Counter
 from prettytable import PrettyTable
 
-from deck_pdf_generator import config, fonts, parser, render
+from deck_pdf_generator import cache, config, deckpack, fonts, parser, pipeline, query, render, store, validate
+from deck_pdf_generator.table import CardTable
+from deck_pdf_generator.validate import validate_xml  # noqa: F401 (backward compatibility)
 
 
-def validate_xml(xml_path: str, xsd_path: str) -> None:
-    """Validate `xml_path` against XSD at `xsd_path` if lxml is available.
+# File types accepted as input when -i points to a directory
+INPUT_EXTENSIONS = (".xml", ".jsonl", ".csv", deckpack.EXTENSION)
 
-    This is a light-weight helper kept here for backward compatibility.
-    """
+
+def _jobs(value: str) -> int:
+    """argparse type for --jobs: a positive integer or "auto" (one per CPU)."""
+    if value == "auto":
+        return os.cpu_count() or 1
     try:
-        from lxml import etree as LET  # type: ignore
-    except Exception:
-        logging.warning("lxml not available; skipping XSD validation for %s", xml_path)
-        return
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or 'auto', got {value!r}")
+    if jobs < 1:
+        raise argparse.ArgumentTypeError("--jobs must be at least 1")
+    return jobs
+
 
+def _selection(value: str) -> query.Selection:
+    """argparse type for --select."""
     try:
-        schema_doc = LET.parse(xsd_path)
-        schema = LET.XMLSchema(schema_doc)
-        doc = LET.parse(xml_path)
-        if not schema.validate(doc):
-            raise RuntimeError(f"XML {xml_path} failed XSD validation against {xsd_path}")
-    except Exception as e:
-        raise
+        return query.parse_selection(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _print_summary(overall_counts: Counter) -> None:
+    pt = PrettyTable(["Balíček", "Počet"])
+    for name, cnt in sorted(overall_counts.items()):
+        pt.add_row([name, cnt])
+    print("\nSouhrnná statistika karet:")
+    print(pt)
+    print(f"Celkem: {sum(overall_counts.values())}")
 
 
 def main() -> None:
     parser_arg = argparse.ArgumentParser(description="Render Gnarl cards from XML to PDF")
     parser_arg.add_argument("-i", "--input", default="cards.xml",
-                            help="Input XML file or directory containing *.xml files")
+                            help="Input card file (.xml, .jsonl, .csv or .deckpack) or a directory containing such files")
     parser_arg.add_argument("-x", "--xsd", default=None,
                             help="Optional XSD file to validate XML against (if omitted, looks for cards.xsd)")
+    parser_arg.add_argument("-c", "--config", dest="config", default=None,
+                            help=f"Icon configuration file (default: {config.ICONS_PATH})")
     parser_arg.add_argument("--color", dest="color", action="store_true", default=False,
                             help="Render in color (default: black & white)")
     parser_arg.add_argument("--zero-gaps", dest="zero_gaps", action="store_true", default=False,
@@ -52,59 +70,169 @@ def main() -> None:
     parser_arg.add_argument("-o", "--outdir", default=os.path.join("out"),
                             help="Output directory for generated PDFs")
     parser_arg.add_argument("--check-icons", dest="check_icons", action="store_true", default=False,
-                            help="Check whether configured icon glyphs are present in the font and print a log")
+                            help="Check that every character drawn for the input cards (names, texts, icons) "
+                                 "has a glyph in one of the registered fonts and list the cards using missing ones, "
+                                 "without rendering")
+    parser_arg.add_argument("--compile", dest="compile", action="store_true", default=False,
+                            help="Compile input XML decks into binary .deckpack files in the output directory "
+                                 "instead of rendering; a .deckpack can then be passed as -i")
+    parser_arg.add_argument("--db", dest="db", default=None,
+                            help="SQLite card store used by --sync and --sql")
+    parser_arg.add_argument("--sync", dest="sync", action="store_true", default=False,
+                            help="Import changed input XML files into the --db store and exit")
+    parser_arg.add_argument("--sql", dest="sql", default=None,
+                            help="Render cards from the --db store matching this SQL WHERE clause, "
+                                 "e.g. \"deck = 'monster'\"; no XML is parsed")
+    parser_arg.add_argument("--check", dest="check", action="store_true", default=False,
+                            help="Validate all input files (XSD and card values) and report every problem "
+                                 "with file:line, without rendering")
+    parser_arg.add_argument("--cache-dir", dest="cache_dir", default=cache.DEFAULT_CACHE_DIR,
+                            help="Directory for the parsed-deck cache")
+    parser_arg.add_argument("--no-cache", dest="use_cache", action="store_false", default=True,
+                            help="Always parse XML; stream cards straight into the renderer")
+    parser_arg.add_argument("--select", dest="select", type=_selection, default=None,
+                            help="Render only cards matching all terms, e.g. 'deck=monster,tag=boss' "
+                                 "(keys: " + ", ".join(query.SELECT_KEYS) + ")")
+    parser_arg.add_argument("--id", dest="ids", action="append", default=None,
+                            help="Render only cards with this id (repeatable, or comma-separated)")
+    parser_arg.add_argument("--huge", dest="huge", action="store_true", default=False,
+                            help="Stream multi-GB XML decks with lxml huge_tree; bypasses the cache "
+                                 "and XSD validation, and writes the PDF in parts of "
+                                 f"{pipeline.HUGE_PAGES_PER_FILE} sheets (<name>_partNNN.pdf)")
+    parser_arg.add_argument("--max-rss", dest="max_rss", type=int, default=None, metavar="MB",
+                            help="With --huge, abort a deck once the process uses more than MB MiB of memory")
+    parser_arg.add_argument("-j", "--jobs", type=_jobs, default=None,
+                            help="Number of files processed in parallel (a number or 'auto'; "
+                                 "default 1, or one per CPU with --check / --check-icons)")
 
     args = parser_arg.parse_args()
+    if args.config:
+        config.set_config_path(args.config)
+
+    if (args.sync or args.sql) and not args.db:
+        parser_arg.error("--sync and --sql require --db")
+    cache_dir = args.cache_dir if args.use_cache else None
+    if args.jobs is None:
+        # checks are read-only and per file, so they use every CPU by default
+        args.jobs = (os.cpu_count() or 1) if args.check or args.check_icons else 1
+
+    if args.sql:
+        os.makedirs(args.outdir, exist_ok=True)
+        # parsed fonts go to --cache-dir, or nowhere with --no-cache
+        fonts.load_fonts(cache_dir)
+        try:
+            runs = store.query_card_runs(args.db, args.sql)
+        except sqlite3.OperationalError as e:
+            parser_arg.error(f"--sql {args.sql!r}: {e}")
+        out_pdf = os.path.join(args.outdir, "query_gnarl_cards.pdf")
+        if runs:
+            render.render_pdf(parser.expand_runs(runs), out_pdf, color=args.color, zero_gaps=args.zero_gaps)
+            print(f"{out_pdf}")
+        _print_summary(CardTable.from_runs(runs).histogram("deck", default="loot"))
+        return
 
     inpath = args.input
     xsd_path = args.xsd or ("cards.xsd" if os.path.exists("cards.xsd") else None)
     use_color = args.color
 
-    if args.check_icons:
-        fonts.check_icon_glyphs()
-        return
-
     # Collect xml files
     xml_files: List[str] = []
-    if os.path.isdir(inpath):
-        xml_files = sorted(glob.glob(os.path.join(inpath, "*.xml")))
+    if args.check_icons and not os.path.exists(inpath):
+        # configured icons are still checked
+        pass
+    elif os.path.isdir(inpath):
+        xml_files = sorted(p for ext in INPUT_EXTENSIONS for p in glob.glob(os.path.join(inpath, "*" + ext)))
         if not xml_files:
-            raise RuntimeError(f"No .xml files found in directory: {inpath}")
+            raise RuntimeError(f"No {' / '.join(INPUT_EXTENSIONS)} files found in directory: {inpath}")
     elif os.path.isfile(inpath):
         xml_files = [inpath]
     else:
         raise RuntimeError(f"Input path not found: {inpath}")
 
+    if args.sync:
+        xml_files = [p for p in xml_files if not deckpack.is_deckpack(p)]
+        stats = store.sync(args.db, xml_files, cache_dir)
+        print(f"{args.db}: importováno {stats['imported']}, beze změny {stats['unchanged']}, "
+              f"odstraněno {stats['removed']}")
+        return
+
+    if args.check_icons:
+        fonts.load_fonts(cache_dir)
+        missing = validate.audit_glyphs(xml_files, jobs=args.jobs, config_path=args.config, cache_dir=cache_dir)
+        for glyph in missing:
+            print(glyph)
+        print(f"Zkontrolováno souborů: {len(xml_files)}, chybějících znaků: {len(missing)}")
+        if missing:
+            raise SystemExit(1)
+        return
+
+    if args.check:
+        # compiled deckpacks were checked when their source was
+        xml_files = [p for p in xml_files if not deckpack.is_deckpack(p)]
+        issues = validate.check_files(xml_files, xsd_path if xsd_path and os.path.exists(xsd_path) else None,
+                                      jobs=args.jobs)
+        for issue in issues:
+            print(issue)
+        print(f"Zkontrolováno souborů: {len(xml_files)}, nalezeno problémů: {len(issues)}")
+        if issues:
+            raise SystemExit(1)
+        return
+
     os.makedirs(args.outdir, exist_ok=True)
 
-    overall_counts: Counter = Counter()
-    for xml_path in xml_files:
-        if xsd_path and os.path.exists(xsd_path):
-            validate_xml(xml_path, xsd_path)
-            logging.info(f"XML {xml_path} validated against {xsd_path}")
-
-        cards = parser.parse_cards(xml_path)
-        if not cards:
-            logging.info(f"No cards found in {xml_path}, skipping")
-            continue
+    if args.compile:
+        for xml_path in xml_files:
+            if not deckpack.is_deckpack(xml_path):
+                try:
+                    out = pipeline.compile_file(xml_path, args.outdir, cache_dir)
+                except ValueError as e:
+                    raise SystemExit(f"{xml_path}: {e}")
+                print(f"{xml_path} -> {out}")
+        return
 
-        # accumulate counts per deck for global statistics
-        deck_names = [(getattr(c, 'deck', None) or 'loot') for c in cards]
-        counts = Counter(deck_names)
-        overall_counts.update(counts)
+    ids = [i.strip() for value in args.ids for i in value.split(",") if i.strip()] if args.ids else None
+
+    results = pipeline.run_files(
+        xml_files,
+        jobs=args.jobs,
+        outdir=args.outdir,
+        xsd_path=xsd_path,
+        color=use_color,
+        zero_gaps=args.zero_gaps,
+        cache_dir=cache_dir,
+        selection=args.select,
+        ids=ids,
+        huge=args.huge,
+        max_rss=args.max_rss * 2 ** 20 if args.max_rss else None,
+        config_path=args.config,
+    )
 
-        base = os.path.splitext(os.path.basename(xml_path))[0]
-        out_pdf = os.path.join(args.outdir, f"{base}_gnarl_cards.pdf")
-        render.render_pdf(cards, out_pdf, color=use_color, zero_gaps=args.zero_gaps)
-        logging.info(f"OK: Rendered {len(cards)} cards to {out_pdf}")
+    overall_counts: Counter = Counter()
+    cache_stats: Counter = Counter()
+    failed = []
+    for res in results:
+        if res.error:
+            logging.error("Failed to process %s: %s", res.xml_path, res.error)
+            failed.append(res)
+            continue
+        overall_counts.update(res.counts)
+        cache_stats.update(res.cache_stats)
 
     # After processing all files, print aggregated statistics
-    pt = PrettyTable(["Balíček", "Počet"])
-    for name, cnt in sorted(overall_counts.items()):
-        pt.add_row([name, cnt])
-    print("\nSouhrnná statistika karet:")
-    print(pt)
-    print(f"Celkem: {sum(overall_counts.values())}")
+    _print_summary(overall_counts)
+    if args.use_cache:
+        print(f"Cache: {cache_stats['hit']} hit, {cache_stats['miss']} miss, "
+              f"{cache_stats['validated']} validation skipped, "
+              f"{cache_stats['fragment_hit']} shared XInclude fragments reused")
+    if cache_stats["cards"]:
+        print(f"Dedup: {cache_stats['front_layouts']} fronts and {cache_stats['back_layouts']} backs laid out "
+              f"for {cache_stats['cards']} cards; {cache_stats['front_duplicates']} fronts and "
+              f"{cache_stats['back_duplicates']} backs reused from identical cards with another id")
+    if failed:
+        print("\nSoubory s chybou:")
+        for res in failed:
+            print(f"  {res.xml_path}: {res.error}")
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":